@@ -0,0 +1,253 @@
+"""Benchmark ZinguoDataUpdateCoordinator against the local cloud stand-in.
+
+Reports refresh latency, command round-trip time, requests per second,
+how quickly a change made outside Home Assistant reaches the coordinator
+with the polling and push transports, and how long a burst of refreshes
+queues behind the account rate limiter. Every other case runs without the
+limiter. Needs homeassistant and aiohttp:
+
+    python -m benchmarks.bench_coordinator --devices 4 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .common import async_create_hass, async_stop_hass, create_client, create_coordinator, print_table, summarize
+from .fake_cloud import FakeZinguoCloud
+
+
+async def bench_refresh(hass, cloud, iterations, bulk_polling):
+    """Time async_refresh on every device of the account, one polling cycle per iteration.
+
+    With bulk polling the account cache is expired at the start of each
+    cycle, as the poll interval would, so every cycle makes one real
+    /customer/devices request shared by all devices.
+    """
+    client = create_client(cloud)
+    coordinators = [
+        create_coordinator(hass, cloud, mac, client=client, bulk_polling=bulk_polling)
+        for mac in cloud.devices
+    ]
+    await coordinators[0].async_refresh()  # 登录不计入
+    cloud.requests.clear()
+    samples = []
+    for _ in range(iterations):
+        # 每轮开始时让账号缓存过期：第一个协调器发出批量请求，其余复用
+        client.async_invalidate_devices()
+        for coordinator in coordinators:
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            samples.append((time.perf_counter() - start) * 1000)
+    requests = sum(cloud.requests.values())
+    await client.async_close()
+    return {
+        "case": f"async_refresh bulk={bulk_polling}",
+        **summarize(samples),
+        "api_requests": requests,
+    }
+
+
+async def bench_command(hass, cloud, iterations, command_window):
+    """Time send_control_command and the background confirmation."""
+    mac = next(iter(cloud.devices))
+    coordinator = create_coordinator(hass, cloud, mac, command_window=command_window)
+    await coordinator.async_refresh()
+    cloud.requests.clear()
+    call_samples = []
+    confirmed_samples = []
+    for index in range(iterations):
+        target = index % 2 == 0
+        start = time.perf_counter()
+        await coordinator.send_control_command({"lightSwitch": target})
+        call_samples.append((time.perf_counter() - start) * 1000)
+        # 等待后台确认完成，得到完整的命令往返时间
+        task = getattr(coordinator, "_confirm_task", None)
+        if task is not None:
+            await task
+        confirmed_samples.append((time.perf_counter() - start) * 1000)
+    requests = sum(cloud.requests.values())
+    await coordinator.async_shutdown()
+    await coordinator.client.async_close()
+    return [
+        {"case": f"send_control_command call window={command_window}", **summarize(call_samples), "api_requests": requests},
+        {"case": f"send_control_command confirmed window={command_window}", **summarize(confirmed_samples), "api_requests": requests},
+    ]
+
+
+async def bench_burst(hass, cloud, command_window):
+    """Send light, ventilation and wind together, as a scene would."""
+    mac = next(iter(cloud.devices))
+    coordinator = create_coordinator(hass, cloud, mac, command_window=command_window)
+    await coordinator.async_refresh()
+    cloud.requests.clear()
+    start = time.perf_counter()
+    await asyncio.gather(
+        coordinator.send_control_command({"lightSwitch": True}),
+        coordinator.send_control_command({"ventilationSwitch": True}),
+        coordinator.send_control_command({"windSwitch": True}),
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    controls = cloud.requests["yuBaControl"]
+    await coordinator.async_shutdown()
+    await coordinator.client.async_close()
+    return {"case": f"3-command burst window={command_window}", **summarize([elapsed]), "api_requests": controls}
+
+
+async def bench_throughput(hass, cloud, duration, concurrency):
+    """Refresh concurrently for a fixed time and report requests per second."""
+    macs = list(cloud.devices)
+    coordinators = [create_coordinator(hass, cloud, macs[i % len(macs)]) for i in range(concurrency)]
+    for coordinator in coordinators:
+        await coordinator.async_refresh()
+    cloud.requests.clear()
+    refreshes = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(coordinator):
+        nonlocal refreshes
+        while time.perf_counter() < deadline:
+            await coordinator.async_refresh()
+            refreshes += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(coordinator) for coordinator in coordinators))
+    elapsed = time.perf_counter() - start
+    for coordinator in coordinators:
+        await coordinator.client.async_close()
+    return {
+        "case": f"throughput concurrency={concurrency}",
+        "refreshes": refreshes,
+        "api_requests": sum(cloud.requests.values()),
+        "requests_per_s": round(sum(cloud.requests.values()) / elapsed, 1),
+        "refreshes_per_s": round(refreshes / elapsed, 1),
+    }
+
+
+async def bench_rate_limit(hass, cloud, refreshes):
+    """Refresh every device of one account at once, ``refreshes`` times, behind the default limits."""
+    from custom_components.zinguo.const import RATE_LIMIT_READ, RATE_LIMITS
+
+    client = create_client(cloud, rate_limits=RATE_LIMITS)
+    coordinators = [create_coordinator(hass, cloud, mac, client=client) for mac in cloud.devices]
+    await coordinators[0].async_refresh()  # 登录不计入
+    cloud.requests.clear()
+    peak_depth = 0
+    samples = []
+
+    async def refresh(coordinator):
+        nonlocal peak_depth
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        samples.append((time.perf_counter() - start) * 1000)
+        peak_depth = max(peak_depth, client.rate_limit_queue_depth)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(refresh(coordinators[i % len(coordinators)]) for i in range(refreshes)))
+    elapsed = time.perf_counter() - start
+    bucket = client.rate_limiters[cloud.base_url][RATE_LIMIT_READ]
+    await client.async_close()
+    return {
+        "case": f"{refreshes} concurrent refreshes rate={RATE_LIMITS[RATE_LIMIT_READ]}",
+        **summarize(samples),
+        "queued": bucket.queued,
+        "timeouts": bucket.timeouts,
+        "peak_queue_depth": peak_depth,
+        "requests_per_s": round(sum(cloud.requests.values()) / elapsed, 1),
+    }
+
+
+async def bench_external_change(hass, cloud, samples, poll_interval, push):
+    """Time a wall-switch change until the coordinator's data reflects it."""
+    from custom_components.zinguo.const import POLL_TIER_ACTIVE, POLL_TIER_IDLE, POLL_TIER_OFFLINE
+    from custom_components.zinguo.transport import CloudPollingTransport, CloudPushTransport
+
+    mac = next(iter(cloud.devices))
+    coordinator = create_coordinator(
+        hass, cloud, mac,
+        poll_intervals=dict.fromkeys((POLL_TIER_ACTIVE, POLL_TIER_IDLE, POLL_TIER_OFFLINE), poll_interval),
+    )
+    transport_cls = CloudPushTransport if push else CloudPollingTransport
+    coordinator.transport = transport_cls(coordinator.client)
+    await coordinator.async_refresh()
+    changed = asyncio.Event()
+    # 有监听器时协调器才按自己的定时器轮询
+    unsub = coordinator.async_add_listener(changed.set, frozenset({"lightSwitch"}))
+    coordinator.async_start_transport()
+    if push:
+        while not coordinator.transport.connected:
+            await asyncio.sleep(0.01)
+    cloud.requests.clear()
+
+    latencies = []
+    for _ in range(samples):
+        changed.clear()
+        start = time.perf_counter()
+        cloud.set_switch(mac, "lightSwitch", not coordinator.data.lightSwitch)
+        await changed.wait()
+        latencies.append((time.perf_counter() - start) * 1000)
+    unsub()
+    requests = sum(cloud.requests.values())
+    await coordinator.async_shutdown()
+    await coordinator.client.async_close()
+    return {
+        "case": f"external change {'push' if push else 'polling'} poll={poll_interval}s",
+        **summarize(latencies),
+        "api_requests": requests,
+    }
+
+
+async def run(args):
+    """Run every benchmark case and print the results."""
+    hass = await async_create_hass()
+    cloud = FakeZinguoCloud(devices=args.devices, latency=args.latency, jitter=args.jitter)
+    await cloud.start()
+    results = {}
+    try:
+        results["refresh"] = [
+            await bench_refresh(hass, cloud, args.iterations, bulk_polling=False),
+            await bench_refresh(hass, cloud, args.iterations, bulk_polling=True),
+        ]
+        results["command"] = [
+            *await bench_command(hass, cloud, args.iterations, command_window=0),
+            await bench_burst(hass, cloud, command_window=0),
+            await bench_burst(hass, cloud, command_window=0.15),
+        ]
+        results["throughput"] = [await bench_throughput(hass, cloud, args.duration, args.concurrency)]
+        results["rate_limit"] = [await bench_rate_limit(hass, cloud, args.rate_limit_refreshes)]
+        results["external"] = [
+            await bench_external_change(hass, cloud, args.change_samples, args.poll_interval, push=False),
+            await bench_external_change(hass, cloud, args.change_samples, args.poll_interval, push=True),
+        ]
+    finally:
+        await cloud.stop()
+        await async_stop_hass(hass)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table("Refresh latency (ms)", results["refresh"])
+        print_table("Command round trip (ms)", results["command"])
+        print_table("Throughput", results["throughput"])
+        print_table("Rate-limited refresh burst (ms)", results["rate_limit"])
+        print_table("External change to coordinator (ms)", results["external"])
+
+
+def main():
+    """Parse arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=4, help="simulated devices on the account")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--duration", type=float, default=5.0, help="throughput run time (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate-limit-refreshes", type=int, default=30, help="refreshes in the rate-limited burst")
+    parser.add_argument("--change-samples", type=int, default=5, help="external changes per transport")
+    parser.add_argument("--poll-interval", type=int, default=5, help="poll interval for the external change case (s)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
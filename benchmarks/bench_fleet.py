@@ -0,0 +1,178 @@
+"""Fleet-scale steady-state benchmark: many config entries on one event loop.
+
+Starts N simulated entries against the local cloud stand-in, attaches the
+same listeners per device that the entity platforms register, lets the
+coordinators' own timers run for a fixed time, and reports event-loop lag,
+RSS, open connections and state writes per second:
+
+    python -m benchmarks.bench_fleet --entries 10,50,200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .common import async_create_hass, async_stop_hass, create_client, create_coordinator, print_table, summarize
+from .fake_cloud import FakeZinguoCloud
+
+# 与各平台实体注册的监听上下文一致：5 个开关、风扇、3 个数值、2 个传感器、选择器、按钮
+ENTITY_CONTEXTS = [
+    frozenset({"lightSwitch"}),
+    frozenset({"warmingSwitch1"}),
+    frozenset({"warmingSwitch2"}),
+    frozenset({"windSwitch"}),
+    frozenset({"ventilationSwitch"}),
+    frozenset({"warmingSwitch1", "warmingSwitch2", "windSwitch"}),
+    frozenset({"ventilationAutoClose"}),
+    frozenset({"warmingAutoClose"}),
+    frozenset({"overHeatAutoClose"}),
+    frozenset({"temperature"}),
+    frozenset({"online", "pollTier", "warmingSwitch1", "warmingSwitch2", "windSwitch", "ventilationSwitch"}),
+    frozenset({"lightAutoClose"}),
+    frozenset(),
+]
+
+
+def rss_mb():
+    """Return the resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def socket_fds():
+    """Return the number of open socket file descriptors, or None."""
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            # listdir 自身的描述符此时已关闭
+            continue
+    return count
+
+
+async def monitor_loop_lag(samples, stop, interval=0.05):
+    """Measure how late the loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - start - interval) * 1000)
+
+
+async def run_scenario(hass, entries, shared_account, args):
+    """Run one fleet size for the configured duration."""
+    from custom_components.zinguo.const import POLL_TIER_ACTIVE, POLL_TIER_IDLE, POLL_TIER_OFFLINE
+
+    cloud = FakeZinguoCloud(devices=entries, latency=args.latency, jitter=args.jitter,
+                            temperature_drift=args.drift)
+    await cloud.start()
+    rss_before = rss_mb()
+
+    shared_client = create_client(cloud) if shared_account else None
+    intervals = {POLL_TIER_ACTIVE: args.interval, POLL_TIER_IDLE: args.interval, POLL_TIER_OFFLINE: args.interval}
+    coordinators = [
+        create_coordinator(hass, cloud, mac, client=shared_client, bulk_polling=shared_account,
+                           poll_intervals=intervals)
+        for mac in cloud.devices
+    ]
+
+    writes = 0
+
+    def state_write():
+        nonlocal writes
+        writes += 1
+
+    # 首次刷新后再挂监听器，挂上后协调器按自己的定时器轮询
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+    unsubs = [
+        coordinator.async_add_listener(state_write, context)
+        for coordinator in coordinators
+        for context in ENTITY_CONTEXTS
+    ]
+    cloud.requests.clear()
+    writes = 0
+
+    lag_samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    result = {
+        "entries": entries,
+        "mode": "shared" if shared_account else "per-entry",
+        "loop_lag_p50_ms": summarize(lag_samples).get("p50"),
+        "loop_lag_p95_ms": summarize(lag_samples).get("p95"),
+        "loop_lag_max_ms": summarize(lag_samples).get("max"),
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+        "open_conns": cloud.open_connections,
+        "socket_fds": socket_fds(),
+        "api_req_per_s": round(sum(cloud.requests.values()) / elapsed, 2),
+        "writes_per_s": round(writes / elapsed, 2),
+    }
+
+    for unsub in unsubs:
+        unsub()
+    clients = {id(coordinator.client): coordinator.client for coordinator in coordinators}
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
+    for client in clients.values():
+        await client.async_close()
+    await cloud.stop()
+    return result
+
+
+async def run(args):
+    """Run every fleet size in both account modes."""
+    hass = await async_create_hass()
+    modes = {"shared": [True], "per-entry": [False], "both": [False, True]}[args.mode]
+    results = []
+    try:
+        for entries in args.entries:
+            for shared_account in modes:
+                results.append(await run_scenario(hass, entries, shared_account, args))
+    finally:
+        await async_stop_hass(hass)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(f"Steady state over {args.duration}s, poll every {args.interval}s", results)
+
+
+def main():
+    """Parse arguments and run the fleet benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=lambda value: [int(part) for part in value.split(",")],
+                        default=[10, 50, 100], help="comma-separated fleet sizes")
+    parser.add_argument("--mode", choices=["shared", "per-entry", "both"], default="both",
+                        help="one account for all entries, one client per entry, or both")
+    parser.add_argument("--duration", type=float, default=30.0, help="steady-state run time (s)")
+    parser.add_argument("--interval", type=int, default=30, help="poll interval for every tier (s)")
+    parser.add_argument("--latency", type=float, default=0.02, help="artificial server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="extra random latency (s)")
+    parser.add_argument("--drift", type=float, default=0.2, help="temperature drift per read (degrees)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
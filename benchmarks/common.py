@@ -0,0 +1,83 @@
+"""Shared helpers for the Zinguo benchmarks."""
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+# 让 custom_components.zinguo 可以从仓库根目录导入
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+async def async_create_hass():
+    """Create a bare Home Assistant instance on the running loop, with the device registry loaded."""
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers import device_registry as dr
+
+    config_dir = tempfile.mkdtemp(prefix="zinguo-bench-")
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # 旧版本的构造函数不接受 config_dir
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    await dr.async_load(hass)
+    return hass
+
+
+async def async_stop_hass(hass):
+    """Stop a Home Assistant instance created by async_create_hass."""
+    await hass.async_stop(force=True)
+
+
+def create_client(cloud, rate_limits=None):
+    """Create an API client for a fake cloud, by default without the rate limiter."""
+    from custom_components.zinguo.api import ZinguoApiClient
+
+    return ZinguoApiClient(cloud.username, "secret", endpoints=[cloud.base_url], rate_limits=rate_limits)
+
+
+def create_coordinator(hass, cloud, mac, client=None, **kwargs):
+    """Create a coordinator for one simulated device of a fake cloud."""
+    from custom_components.zinguo.coordinator import ZinguoDataUpdateCoordinator
+
+    if client is None:
+        client = create_client(cloud)
+    device = cloud.devices[mac]
+    return ZinguoDataUpdateCoordinator(
+        hass,
+        username=cloud.username,
+        password="secret",
+        mac=mac,
+        name=device["name"],
+        client=client,
+        **kwargs,
+    )
+
+
+def summarize(samples_ms):
+    """Return count, mean, p50, p95 and max of latency samples in ms."""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "p50": round(ordered[int(0.50 * (len(ordered) - 1))], 2),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def print_table(title, rows):
+    """Print rows of dicts as an aligned table."""
+    print(f"\n== {title} ==")
+    if not rows:
+        print("(no results)")
+        return
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
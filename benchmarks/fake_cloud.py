@@ -0,0 +1,257 @@
+"""Local stand-in for the Zinguo cloud API.
+
+Serves the endpoints the integration uses under ``/api/v1`` and keeps a
+stateful simulation of every device: switches use the 1=ON/2=OFF encoding,
+turning on either warming channel forces wind on, and ``turnOffAll`` turns
+every switch off. ``/events`` streams every device change (including
+``set_switch`` calls that stand in for the wall switch or vendor app) as
+server-sent events.
+
+Run standalone with ``python -m benchmarks.fake_cloud --devices 3``.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import secrets
+from collections import Counter
+
+from aiohttp import web
+
+API_PREFIX = "/api/v1"
+ON = 1
+OFF = 2
+SWITCH_KEYS = ("warmingSwitch1", "warmingSwitch2", "windSwitch", "lightSwitch", "ventilationSwitch")
+PARAM_KEYS = ("ventilationAutoClose", "warmingAutoClose", "overHeatAutoClose", "lightAutoClose", "comovement", "motoVersion")
+
+
+def make_device(index):
+    """Return the raw cloud record for simulated device number ``index``."""
+    return {
+        "_id": f"fake{index:06d}",
+        "mac": f"AA:BB:CC:{index >> 16 & 0xFF:02X}:{index >> 8 & 0xFF:02X}:{index & 0xFF:02X}",
+        "name": f"浴霸 {index}",
+        "model": "B2",
+        "online": 1,
+        "temperature": 22.0,
+        "lightSwitch": OFF,
+        "warmingSwitch1": OFF,
+        "warmingSwitch2": OFF,
+        "windSwitch": OFF,
+        "ventilationSwitch": OFF,
+        "ventilationAutoClose": 15,
+        "warmingAutoClose": 30,
+        "overHeatAutoClose": 45,
+        "lightAutoClose": {"stopHour": 0, "stopMinute": 0, "status": False},
+        "comovement": 3,
+        "motoVersion": 2,
+        "hardwareVersion": "1.0",
+        "softwareVersion": "2.3.1",
+    }
+
+
+class FakeZinguoCloud:
+    """Stateful stand-in server for one account."""
+
+    def __init__(self, username="13800000000", password="secret", devices=1,
+                 latency=0.0, jitter=0.0, include_status_in_list=True, temperature_drift=0.0,
+                 event_ping_interval=15.0, event_stream=True):
+        """Initialize.
+
+        ``latency``/``jitter`` add an artificial delay (seconds) to every
+        response. ``include_status_in_list`` controls whether
+        /customer/devices carries switch state, to exercise the per-MAC
+        fallback of bulk polling. ``temperature_drift`` randomly moves each
+        device's temperature by up to that many degrees on every read.
+        ``event_ping_interval`` is the keep-alive period of ``/events``;
+        ``event_stream=False`` leaves ``/events`` out, like the vendor cloud.
+        """
+        self.username = username
+        self.password_hash = hashlib.sha1(password.encode()).hexdigest()
+        self.latency = latency
+        self.jitter = jitter
+        self.include_status_in_list = include_status_in_list
+        self.temperature_drift = temperature_drift
+        self.devices = {}
+        for index in range(devices):
+            device = make_device(index)
+            self.devices[device["mac"]] = device
+        self.tokens = set()
+        self.event_ping_interval = event_ping_interval
+        self._event_queues = set()
+        self._event_tasks = set()
+        self.requests = Counter()
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_post(f"{API_PREFIX}/customer/login", self._login)
+        self.app.router.add_get(f"{API_PREFIX}/customer/devices", self._devices)
+        self.app.router.add_get(f"{API_PREFIX}/device/getDeviceByMac", self._device_by_mac)
+        self.app.router.add_put(f"{API_PREFIX}/wifiyuba/yuBaControl", self._control)
+        if event_stream:
+            self.app.router.add_get(f"{API_PREFIX}/events", self._events)
+        self._runner = None
+        self.base_url = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving and return the API base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}{API_PREFIX}"
+        return self.base_url
+
+    async def stop(self):
+        """Stop serving."""
+        for task in list(self._event_tasks):
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def open_connections(self):
+        """Return the number of client connections the server holds open."""
+        server = self._runner.server if self._runner else None
+        return len(server.connections) if server is not None else 0
+
+    @property
+    def event_subscribers(self):
+        """Return the number of open /events streams."""
+        return len(self._event_queues)
+
+    def set_switch(self, mac, key, on):
+        """Change a switch outside the API, as the wall switch or vendor app would."""
+        device = self.devices[mac]
+        device[key] = ON if on else OFF
+        if key.startswith("warmingSwitch") and on:
+            device["windSwitch"] = ON
+        self._publish(device)
+
+    def _publish(self, device):
+        for queue in self._event_queues:
+            queue.put_nowait(dict(device))
+
+    def expire_tokens(self):
+        """Invalidate every issued token so the next request gets a 401."""
+        self.tokens.clear()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests[request.path.rsplit("/", 1)[-1]] += 1
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        if not request.path.endswith("/customer/login") and request.headers.get("x-access-token") not in self.tokens:
+            return web.json_response({"message": "unauthorized"}, status=401)
+        return await handler(request)
+
+    async def _login(self, request):
+        # APP 以 text/plain 发送 JSON
+        body = json.loads(await request.text())
+        if body.get("account") != self.username or body.get("password") != self.password_hash:
+            return web.json_response({"message": "invalid credentials"}, status=401)
+        token = secrets.token_hex(16)
+        self.tokens.add(token)
+        return web.json_response({"token": token})
+
+    def _drift(self, device):
+        if self.temperature_drift:
+            device["temperature"] = round(
+                device["temperature"] + random.uniform(-self.temperature_drift, self.temperature_drift), 1
+            )
+
+    async def _devices(self, request):
+        for device in self.devices.values():
+            self._drift(device)
+        if self.include_status_in_list:
+            return web.json_response(list(self.devices.values()))
+        return web.json_response([
+            {key: device[key] for key in ("_id", "mac", "name", "model", "online")}
+            for device in self.devices.values()
+        ])
+
+    async def _device_by_mac(self, request):
+        device = self.devices.get(request.query.get("mac"))
+        if device is None:
+            return web.json_response({"message": "not found"}, status=404)
+        self._drift(device)
+        return web.json_response(device)
+
+    async def _control(self, request):
+        body = json.loads(await request.text())
+        device = self.devices.get(body.get("mac"))
+        if device is None:
+            return web.json_response({"message": "not found"}, status=404)
+
+        if body.get("setParamter"):
+            for key in PARAM_KEYS:
+                if key in body:
+                    device[key] = body[key]
+        elif body.get("turnOffAll") == 1:
+            for key in SWITCH_KEYS:
+                device[key] = OFF
+        else:
+            for key in SWITCH_KEYS:
+                if body.get(key) in (ON, OFF):
+                    device[key] = body[key]
+            # 任一暖风开启时强制开启吹风
+            if device["warmingSwitch1"] == ON or device["warmingSwitch2"] == ON:
+                device["windSwitch"] = ON
+        self._publish(device)
+        return web.json_response({"code": 0, "message": "success"})
+
+    async def _events(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        queue = asyncio.Queue()
+        self._event_queues.add(queue)
+        self._event_tasks.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    device = await asyncio.wait_for(queue.get(), self.event_ping_interval)
+                except asyncio.TimeoutError:
+                    await response.write(b": ping\n\n")
+                    continue
+                await response.write(b"event: device\ndata: " + json.dumps(device).encode() + b"\n\n")
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self._event_queues.discard(queue)
+            self._event_tasks.discard(asyncio.current_task())
+        return response
+
+
+async def _serve(args):
+    cloud = FakeZinguoCloud(
+        username=args.username, password=args.password, devices=args.devices,
+        latency=args.latency, jitter=args.jitter,
+    )
+    base_url = await cloud.start(args.host, args.port)
+    print(f"Fake Zinguo cloud for {args.username} with {args.devices} devices at {base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await cloud.stop()
+
+
+def main():
+    """Run the stand-in server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="13800000000")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,49 +6,149 @@ from typing import Any
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
+from .api import async_acquire_client, async_release_client
+from .const import (
+    CONF_ACTIVE_INTERVAL,
+    CONF_BULK_POLLING,
+    CONF_COMMAND_WINDOW,
+    CONF_DEVICE_ID,
+    CONF_HEDGING,
+    CONF_IDLE_AFTER,
+    CONF_IDLE_INTERVAL,
+    CONF_OFFLINE_INTERVAL,
+    CONF_TEMPERATURE_WINDOW,
+    DEFAULT_ACTIVE_INTERVAL,
+    DEFAULT_BULK_POLLING,
+    DEFAULT_COMMAND_WINDOW,
+    DEFAULT_HEDGING,
+    DEFAULT_IDLE_AFTER,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_OFFLINE_INTERVAL,
+    DEFAULT_TEMPERATURE_WINDOW,
+    DOMAIN,
+    POLL_TIER_ACTIVE,
+    POLL_TIER_IDLE,
+    POLL_TIER_OFFLINE,
+    STORAGE_KEY_SNAPSHOT,
+    STORAGE_VERSION,
+)
 from .coordinator import ZinguoDataUpdateCoordinator # 导入协调器
+from .services import async_setup_services
+from .transport import CloudPollingTransport
 
 PLATFORMS: list[Platform] = [Platform.SWITCH, Platform.FAN, Platform.SENSOR, Platform.BUTTON, Platform.NUMBER, Platform.SELECT]
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the integration's services."""
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Zinguo from a config entry."""
     _LOGGER.debug("Setting up Zinguo integration for entry: %s", entry.entry_id)
 
+    # 同一账号的条目共用一个 API 客户端
+    client = async_acquire_client(
+        hass, entry.entry_id, entry.data["username"], entry.data["password"]
+    )
+
     # 创建协调器实例
     coordinator = ZinguoDataUpdateCoordinator(
         hass=hass,
         username=entry.data["username"],
         password=entry.data["password"],
         mac=entry.data["mac"],
-        name=entry.data["name"]
+        name=entry.data["name"],
+        client=client,
+        bulk_polling=entry.options.get(CONF_BULK_POLLING, DEFAULT_BULK_POLLING),
+        command_window=entry.options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW),
+        poll_intervals={
+            POLL_TIER_ACTIVE: entry.options.get(CONF_ACTIVE_INTERVAL, DEFAULT_ACTIVE_INTERVAL),
+            POLL_TIER_IDLE: entry.options.get(CONF_IDLE_INTERVAL, DEFAULT_IDLE_INTERVAL),
+            POLL_TIER_OFFLINE: entry.options.get(CONF_OFFLINE_INTERVAL, DEFAULT_OFFLINE_INTERVAL),
+        },
+        idle_after=entry.options.get(CONF_IDLE_AFTER, DEFAULT_IDLE_AFTER),
+        hedging=entry.options.get(CONF_HEDGING, DEFAULT_HEDGING),
+        device_id=entry.data.get(CONF_DEVICE_ID),
+        snapshot_store=_snapshot_store(hass, entry),
+        transport=CloudPollingTransport(client),
+        temperature_window=entry.options.get(CONF_TEMPERATURE_WINDOW, DEFAULT_TEMPERATURE_WINDOW),
     )
 
     # 将协调器实例存储到 hass.data 中
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
 
-    # 初始化协调器（首次刷新），获取设备实际状态
-    _LOGGER.debug("Fetching initial device state...")
-    await coordinator.async_refresh()
-    
-    if coordinator.data:
-        _LOGGER.info("Successfully fetched initial device state for %s", coordinator.name)
-        _LOGGER.debug("Initial device state: %s", coordinator.data)
+    # 先恢复上次保存的状态，实体启动时即显示最近的真实值
+    await coordinator.async_restore_snapshot()
+    if coordinator.device_id is None and coordinator.data is not None and coordinator.data.id:
+        # 快照中有设备标识，同样可以不等待云端
+        coordinator.device_id = coordinator.data.id
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE_ID: coordinator.device_id}
+        )
+
+    if coordinator.device_id is None:
+        # 旧条目没有保存设备标识，只能等待首次刷新；失败时抛出
+        # ConfigEntryNotReady，由 Home Assistant 退避重试
+        _LOGGER.debug("No stored identity for %s, fetching initial device state", coordinator.name)
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            # 重试前释放本次设置占用的资源，否则共享客户端的引用永远不会归零
+            hass.data[DOMAIN].pop(entry.entry_id, None)
+            await coordinator.async_shutdown()
+            await async_release_client(hass, entry.entry_id, entry.data["username"])
+            raise
+        coordinator.device_id = coordinator.data.id
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE_ID: coordinator.device_id}
+        )
     else:
-        _LOGGER.warning("Failed to fetch initial device state, using default values")
+        # 实体按保存的标识注册，首次刷新在后台进行，不阻塞启动
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{coordinator.name} initial refresh"
+        )
 
-    # 加载平台，此时coordinator.data已包含最新设备状态
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    coordinator.async_start_transport()
+
+    # 选项修改后重新加载条目
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
 
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_SNAPSHOT}.{entry.entry_id}")
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unloaded := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
+        # 最后一个条目卸载时关闭账号共享的会话
+        await async_release_client(hass, entry.entry_id, entry.data["username"])
 
     return unloaded
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the saved device state of a removed entry."""
+    # 条目先被卸载：协调器关闭时已写入快照并取消延迟保存，删除后不会被写回
+    await _snapshot_store(hass, entry).async_remove()
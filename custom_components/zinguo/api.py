@@ -0,0 +1,867 @@
+"""Account-level API client for the Zinguo cloud."""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+import aiohttp
+import async_timeout
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库解码
+    orjson = None
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import (
+    API_ENDPOINTS,
+    DATA_CLIENTS,
+    DATA_TOKEN_STORE,
+    DOMAIN,
+    ENDPOINT_PROBE_TIMEOUT,
+    ENDPOINT_REPROBE_INTERVAL,
+    ENDPOINT_SWITCH_RATIO,
+    EVENT_RECONNECT_MAX_DELAY,
+    EVENT_RECONNECT_MIN_DELAY,
+    EVENT_STREAM_IDLE_TIMEOUT,
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_MAX_DELAY,
+    HEDGE_MIN_DELAY,
+    HEDGE_QUANTILE,
+    RATE_LIMIT_QUEUE_TIMEOUT,
+    RATE_LIMIT_READ,
+    RATE_LIMIT_WRITE,
+    RATE_LIMITS,
+    REQUEST_MAX_ATTEMPTS,
+    REQUEST_TIMEOUT,
+    SIGNAL_PRIMARY_ENTRY_CHANGED,
+    STORAGE_KEY_TOKENS,
+    STORAGE_VERSION,
+    TOKEN_SAVE_DELAY,
+)
+from .resilience import STATE_OPEN, CircuitBreaker, RetryBudget, TokenBucket, backoff_delay
+from .state import project
+from .stats import ApiStats, RequestTracer
+
+_LOGGER = logging.getLogger(__name__)
+
+# 模拟手机APP的请求头
+APP_HEADERS = {
+    "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
+    "Accept": "*/*",
+    "Accept-Language": "zh-cn",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive"
+}
+
+
+class ZinguoTokenStore:
+    """Token, endpoint and issue time per account, kept across restarts."""
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize."""
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY_TOKENS)
+        self._accounts: dict[str, dict] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _async_load(self):
+        async with self._load_lock:
+            if self._accounts is None:
+                data = await self._store.async_load() or {}
+                self._accounts = data.get("accounts", {})
+        return self._accounts
+
+    async def async_get(self, username):
+        """Return the cached login for an account, if any."""
+        return (await self._async_load()).get(username)
+
+    async def async_set(self, username, token, base_url, issued_at):
+        """Cache a fresh login for an account."""
+        accounts = await self._async_load()
+        accounts[username] = {"token": token, "base_url": base_url, "issued_at": issued_at}
+        self._store.async_delay_save(lambda: {"accounts": accounts}, TOKEN_SAVE_DELAY)
+
+
+@callback
+def async_get_token_store(hass: HomeAssistant) -> ZinguoTokenStore:
+    """Return the shared token store."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_TOKEN_STORE not in domain_data:
+        domain_data[DATA_TOKEN_STORE] = ZinguoTokenStore(hass)
+    return domain_data[DATA_TOKEN_STORE]
+
+
+class ZinguoApiClient:
+    """Session, token and endpoint shared by every config entry of one account."""
+
+    def __init__(self, username, password, endpoints=None, token_store=None, reuse_cached_token=True,
+                 rate_limits=RATE_LIMITS):
+        """Initialize.
+
+        ``rate_limits`` maps read/write to (requests per second, burst) per
+        endpoint; None turns the limiter off.
+        """
+        self.username = username
+        self.password = password
+        self.token = None
+        self.token_issued_at = None
+        # 持久化的 token 缓存，首次登录前尝试复用
+        self._token_store = token_store
+        self._token_restored = token_store is None or not reuse_cached_token
+        self._endpoints = list(endpoints or API_ENDPOINTS)
+        self._base_url = None  # Will be set during login
+        # 各端点最近一次探测的往返时间（秒），None 表示不可用
+        self._endpoint_rtts: dict[str, float | None] = {}
+        self._probe_tasks: set[asyncio.Task] = set()
+        self._unsub_reprobe = None
+        # 每个端点一个熔断器；重试预算在账号的所有请求间共享
+        self.breakers = {endpoint: CircuitBreaker() for endpoint in self._endpoints}
+        self.retry_budget = RetryBudget()
+        # 每个端点的读、写令牌桶，同一账号的所有协调器共用
+        self._rate_limits = rate_limits
+        self.rate_limiters: dict[str, dict[str, TokenBucket]] = {}
+        # 创建共享会话，禁用SSL验证以解决证书过期问题
+        conn = aiohttp.TCPConnector(ssl=False)
+        # 记录最近请求各阶段耗时，供诊断下载
+        self.tracer = RequestTracer()
+        self._session = aiohttp.ClientSession(connector=conn, trace_configs=[self.tracer.trace_config])
+        # 同一账号下的多个协调器共用一次登录
+        self._login_lock = asyncio.Lock()
+        # 按加入顺序记录使用该客户端的条目，第一个条目承载账号级诊断实体
+        self._entry_ids: dict[str, None] = {}
+        self.devices = []
+        self.stats = ApiStats()
+        # 账号级批量轮询缓存：mac -> 原始设备数据
+        self._devices_lock = asyncio.Lock()
+        self._devices_by_mac: dict[str, dict] = {}
+        self._devices_fetched_at = None
+        # 推送事件流：每个账号一条长连接，按 mac 分发给订阅者
+        self._event_subscribers: dict[str, list] = {}
+        self._event_task: asyncio.Task | None = None
+        self.events_connected = False
+        # 事件流返回 401 的 token；轮询重新登录换了 token 之前不再重连
+        self._event_rejected_token = None
+
+    @property
+    def primary_entry_id(self):
+        """Return the entry that owns the account-level entities."""
+        return next(iter(self._entry_ids), None)
+
+    @property
+    def endpoint_rtts(self):
+        """Return the last measured RTT per endpoint, None when unreachable."""
+        return dict(self._endpoint_rtts)
+
+    @property
+    def endpoints(self):
+        """Return the configured endpoints."""
+        return list(self._endpoints)
+
+    @property
+    def base_url(self):
+        """Return the detected endpoint or the default one."""
+        return self._base_url or self._endpoints[0]
+
+    def _breaker(self, endpoint):
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker()
+        return breaker
+
+    def _rate_limiter(self, endpoint, method):
+        if self._rate_limits is None:
+            return None
+        buckets = self.rate_limiters.get(endpoint)
+        if buckets is None:
+            buckets = self.rate_limiters[endpoint] = {
+                kind: TokenBucket(rate, burst) for kind, (rate, burst) in self._rate_limits.items()
+            }
+        return buckets[RATE_LIMIT_READ if method == "GET" else RATE_LIMIT_WRITE]
+
+    async def _async_rate_limit(self, endpoint, method, operation):
+        """Take a token from the endpoint's read or write bucket.
+
+        Raises UpdateFailed after RATE_LIMIT_QUEUE_TIMEOUT seconds in line.
+        """
+        limiter = self._rate_limiter(endpoint, method)
+        if limiter is not None and not await limiter.acquire(RATE_LIMIT_QUEUE_TIMEOUT):
+            _LOGGER.warning("%s %s waited %ds for the rate limit on %s, giving up",
+                            method, operation, RATE_LIMIT_QUEUE_TIMEOUT, endpoint)
+            raise UpdateFailed(f"Rate limit queue timeout for {operation}")
+
+    @property
+    def rate_limit_queue_depth(self):
+        """Return how many requests are waiting for a rate-limit token."""
+        return sum(
+            bucket.queue_depth for buckets in self.rate_limiters.values() for bucket in buckets.values()
+        )
+
+    def rate_limit_recent_wait(self, kind):
+        """Return the longest recent rate-limit wait (seconds) of reads or writes on any endpoint."""
+        return max((buckets[kind].recent_max_wait() for buckets in self.rate_limiters.values()), default=0.0)
+
+    def _candidate_endpoints(self):
+        """Return the preferred endpoint followed by the others by RTT."""
+        preferred = self.base_url
+        return [preferred, *(endpoint for endpoint in self.ranked_endpoints if endpoint != preferred)]
+
+    def _select_endpoint(self):
+        """Return the first endpoint whose breaker lets a request through."""
+        for endpoint in self._candidate_endpoints():
+            if self._breaker(endpoint).allow_request():
+                return endpoint
+        return None
+
+    @property
+    def active_endpoint(self):
+        """Return where requests currently go: the preferred endpoint unless its breaker is open."""
+        for endpoint in self._candidate_endpoints():
+            if self._breaker(endpoint).state != STATE_OPEN:
+                return endpoint
+        return self.base_url
+
+    def _login_payload(self):
+        # 根据抓包数据，密码需要进行SHA-1加密
+        return {
+            "account": self.username,
+            "password": hashlib.sha1(self.password.encode()).hexdigest()
+        }
+
+    @property
+    def ranked_endpoints(self):
+        """Return endpoints ordered by measured RTT, unreachable ones last."""
+        def rank(endpoint):
+            rtt = self._endpoint_rtts.get(endpoint)
+            return (rtt is None, rtt or 0.0, self._endpoints.index(endpoint))
+        return sorted(self._endpoints, key=rank)
+
+    async def _test_endpoint(self, base_url):
+        """Test if a given API endpoint is working by attempting login."""
+        headers = {"Content-Type": "text/plain;charset=UTF-8", **APP_HEADERS}
+        login_url = f"{base_url}/customer/login"
+        _LOGGER.debug("Testing endpoint: %s", base_url)
+
+        # 登录探测同样消耗写入令牌；排队超时不算端点故障
+        try:
+            await self._async_rate_limit(base_url, "POST", "login")
+        except UpdateFailed:
+            return base_url, None
+        start = time.monotonic()
+        try:
+            async with async_timeout.timeout(ENDPOINT_PROBE_TIMEOUT):
+                async with self._session.post(login_url, json=self._login_payload(), headers=headers) as response:
+                    body = await response.read()
+            _LOGGER.debug("Endpoint %s response status: %d", base_url, response.status)
+
+            if response.status == 200:
+                # Try to parse JSON to verify valid response
+                data = decode_json(body)
+                if "token" in data:
+                    rtt = self._endpoint_rtts[base_url] = time.monotonic() - start
+                    self.stats.record(base_url, "login", rtt * 1000, True)
+                    _LOGGER.debug("Endpoint %s is working", base_url)
+                    return base_url, data["token"]
+        except Exception as ex:
+            _LOGGER.debug("Endpoint %s test failed: %s", base_url, ex)
+        self._endpoint_rtts[base_url] = None
+        self.stats.record(base_url, "login", (time.monotonic() - start) * 1000, False)
+        return base_url, None
+
+    async def _find_working_endpoint(self):
+        """Log in on all endpoints concurrently and take the first healthy one.
+
+        Once one login wins the others are cancelled, so the account holds a
+        single fresh token; the losing endpoints are then ranked in the
+        background with the login-free probe.
+        """
+        tasks = {asyncio.ensure_future(self._test_endpoint(endpoint)): endpoint for endpoint in self._endpoints}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                endpoint, token = await next_done
+                if token:
+                    _LOGGER.info("Found working endpoint: %s", endpoint)
+                    for task, other in tasks.items():
+                        if other != endpoint and not task.done():
+                            self._track_probe(self._probe_endpoint(other))
+                    return endpoint, token
+        finally:
+            # 其余登录会各自签发 token，单会话账号上会顶掉已采用的 token
+            for task in tasks:
+                task.cancel()
+
+        _LOGGER.error("No working API endpoint found")
+        raise Exception("No working API endpoint found")
+
+    def _track_probe(self, coro):
+        """Run a background probe that async_close cancels."""
+        task = asyncio.ensure_future(coro)
+        self._probe_tasks.add(task)
+        task.add_done_callback(self._probe_tasks.discard)
+
+    async def _probe_endpoint(self, base_url):
+        """Measure round-trip time to an endpoint without logging in."""
+        try:
+            await self._async_rate_limit(base_url, "GET", "probe")
+        except UpdateFailed:
+            # 令牌用尽时跳过本轮测量，保留上次的 RTT
+            return
+        start = time.monotonic()
+        try:
+            async with async_timeout.timeout(ENDPOINT_PROBE_TIMEOUT):
+                async with self._session.get(f"{base_url}/customer/devices", headers=APP_HEADERS) as response:
+                    await response.read()
+            # 未登录时返回 401 也说明端点可达
+            healthy = response.status < 500
+        except (asyncio.TimeoutError, aiohttp.ClientError) as ex:
+            _LOGGER.debug("Endpoint %s probe failed: %s", base_url, ex)
+            healthy = False
+        rtt = time.monotonic() - start
+        self._endpoint_rtts[base_url] = rtt if healthy else None
+        self.stats.record(base_url, "probe", rtt * 1000, healthy)
+
+    async def async_reprobe_endpoints(self, _now=None):
+        """Re-rank endpoints and move traffic to a clearly faster one."""
+        await asyncio.gather(*(self._probe_endpoint(endpoint) for endpoint in self._endpoints))
+        best = self.ranked_endpoints[0]
+        best_rtt = self._endpoint_rtts.get(best)
+        current = self._base_url
+        if current is None or best == current or best_rtt is None:
+            return
+
+        current_rtt = self._endpoint_rtts.get(current)
+        if current_rtt is None or best_rtt < current_rtt * ENDPOINT_SWITCH_RATIO:
+            _LOGGER.info(
+                "Switching endpoint from %s (%s) to %s (%.3fs)",
+                current, "unreachable" if current_rtt is None else f"{current_rtt:.3f}s", best, best_rtt,
+            )
+            # token 在新端点失效时，async_request 会在 401 后重新登录
+            self._base_url = best
+
+    @callback
+    def async_start(self, hass: HomeAssistant):
+        """Schedule the periodic endpoint re-probe."""
+        if self._unsub_reprobe is None:
+            self._unsub_reprobe = async_track_time_interval(
+                hass, self.async_reprobe_endpoints, ENDPOINT_REPROBE_INTERVAL
+            )
+
+    async def async_login(self, stale_token=None):
+        """Login once for all coordinators of this account.
+
+        A caller that got a 401 passes the token it used; if another caller
+        already replaced that token, the new one is reused without logging in.
+        """
+        async with self._login_lock:
+            if self.token and self.token != stale_token:
+                return
+            if not self._token_restored:
+                # 重启后首次请求：复用上次保存的 token 和端点，401 时才重新登录
+                self._token_restored = True
+                cached = await self._token_store.async_get(self.username)
+                if cached and cached.get("token"):
+                    _LOGGER.debug("Reusing cached token for %s on %s", self.username, cached.get("base_url"))
+                    self.token = cached["token"]
+                    self._base_url = cached.get("base_url") or self._base_url
+                    self.token_issued_at = cached.get("issued_at")
+                    return
+            self.token = None
+            if stale_token is not None:
+                self.stats.relogins += 1
+            await self._login()
+            self.token_issued_at = time.time()
+            if self._token_store is not None:
+                await self._token_store.async_set(
+                    self.username, self.token, self._base_url, self.token_issued_at
+                )
+
+    async def _login(self):
+        """Login to Zinguo API using endpoint detection."""
+        # Find a working endpoint first
+        if not self._base_url:
+            self._base_url, self.token = await self._find_working_endpoint()
+            _LOGGER.debug("Login using detected endpoint: %s", self._base_url)
+            return  # Token already obtained from _find_working_endpoint
+
+        # 首选端点熔断时在备用端点登录
+        base_url = self.active_endpoint
+        headers = {"Content-Type": "text/plain;charset=UTF-8", **APP_HEADERS}
+        login_url = f"{base_url}/customer/login"
+        _LOGGER.debug("Attempting login to %s with username: %s", login_url, self.username)
+
+        breaker = self._breaker(base_url)
+        await self._async_rate_limit(base_url, "POST", "login")
+        start = time.monotonic()
+        try:
+            async with async_timeout.timeout(REQUEST_TIMEOUT):
+                async with self._session.post(login_url, json=self._login_payload(), headers=headers) as response:
+                    body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            breaker.record_failure()
+            self.stats.record(base_url, "login", (time.monotonic() - start) * 1000, False)
+            # 端点不可达时并发尝试所有端点登录，后续请求由熔断器选择端点
+            _LOGGER.warning("Login to %s failed (%r), trying all endpoints", base_url, ex)
+            _, self.token = await self._find_working_endpoint()
+            return
+        if response.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        self.stats.record(base_url, "login", (time.monotonic() - start) * 1000, response.status == 200)
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            # 只在开启调试日志时构造响应头和正文的转储
+            _LOGGER.debug("Login response status: %d", response.status)
+            _LOGGER.debug("Login response headers: %s", dict(response.headers))
+            _LOGGER.debug("Login response text (first 1000 chars): %s", _preview(body, 1000))
+
+        try:
+            if response.status == 200:
+                # 手动解析JSON，因为API返回的Content-Type可能不正确
+                data = decode_json(body)
+
+                # 从响应中提取token
+                self.token = data.get("token")
+                if not self.token:
+                    _LOGGER.error("Login failed: No token received in response: %s", data)
+                    raise ConfigEntryAuthFailed("Login failed: No token received")
+
+                _LOGGER.debug("Login successful for username: %s", self.username)
+            elif response.status == 401:
+                _LOGGER.error("Login failed: Invalid credentials for username: %s", self.username)
+                raise ConfigEntryAuthFailed("Invalid credentials")
+            else:
+                response_text = _preview(body, 1000)
+                _LOGGER.error("Login failed with status %d: %s", response.status, response_text)
+                raise ConfigEntryAuthFailed(f"Login failed with status {response.status}: {response_text}")
+        except json.JSONDecodeError as ex:
+            _LOGGER.error("Failed to parse login response as JSON: %s", ex)
+            raise ConfigEntryAuthFailed(f"Login failed: Invalid response format: {ex}")
+        except ConfigEntryAuthFailed:
+            raise
+        except Exception as ex:
+            _LOGGER.error("Exception during login: %s", ex)
+            raise ConfigEntryAuthFailed(f"Login failed: {str(ex)}")
+
+    async def async_request(self, method, path, *, params=None, json_payload=None, content_type=None,
+                            hedge=False):
+        """Send an authenticated request through the endpoint circuit breakers.
+
+        Connection errors, timeouts and 5xx responses are retried with
+        jittered exponential backoff while the retry budget allows, failing
+        over to the next endpoint whose breaker is not open. With ``hedge``
+        a slow GET is raced against the next endpoint; other methods are
+        never hedged, since the losing leg is only cancelled on our side
+        and the server may still apply it. Returns the response status and
+        raw body bytes.
+        """
+        hedge = hedge and method == "GET"
+        if not self.token:
+            await self.async_login()
+
+        self.retry_budget.record_request()
+        result = None
+        error = None
+        for attempt in range(REQUEST_MAX_ATTEMPTS):
+            endpoint = self._select_endpoint()
+            if endpoint is None:
+                raise UpdateFailed("All API endpoints are unavailable (circuit open)")
+            request = (method, path, params, json_payload, content_type)
+            try:
+                if hedge:
+                    # 对冲时由先完成的端点给出结果，另一端点的结果已在内部记录
+                    endpoint, task = await self._async_send_hedged(endpoint, request)
+                    result = task.result()
+                else:
+                    result = await self._async_send(endpoint, *request)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self._breaker(endpoint).record_failure()
+                result, error = None, err
+                _LOGGER.debug("%s %s on %s failed: %r", method, path, endpoint, err)
+            except BaseException:
+                # 取消、限流排队超时、登录失败等都没有试探出端点状态；
+                # 归还半开试探名额，否则熔断器会一直拒绝请求
+                self._breaker(endpoint).release()
+                raise
+            else:
+                if result[0] < 500:
+                    self._breaker(endpoint).record_success()
+                    return result
+                self._breaker(endpoint).record_failure()
+                error = None
+                _LOGGER.debug("%s %s on %s returned %d", method, path, endpoint, result[0])
+
+            if attempt + 1 >= REQUEST_MAX_ATTEMPTS or not self.retry_budget.try_spend():
+                break
+            await asyncio.sleep(backoff_delay(attempt))
+
+        if error is not None:
+            raise error
+        return result
+
+    def _hedge_delay(self, operation):
+        """Return how long to wait for the preferred endpoint before hedging."""
+        p95 = self.stats.percentile(operation, HEDGE_QUANTILE)
+        if p95 is None:
+            return HEDGE_DEFAULT_DELAY
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95 / 1000))
+
+    async def _async_send_hedged(self, primary, request):
+        """Send to ``primary`` and, if it is slow, the same request to a second endpoint.
+
+        Returns the endpoint that finished first with a usable answer and
+        its finished task; the other request is cancelled. When one side
+        fails while the other is still running, its failure is recorded on
+        its breaker and the other is awaited.
+        """
+        operation = request[1].rsplit("/", 1)[-1]
+        delay = self._hedge_delay(operation)
+        primary_task = asyncio.ensure_future(self._async_send(primary, *request))
+        tasks = {primary_task: primary}
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            if done:
+                return primary, primary_task
+            secondary = next(
+                (endpoint for endpoint in self._candidate_endpoints()
+                 if endpoint != primary and self._breaker(endpoint).allow_request()),
+                None,
+            )
+            if secondary is None:
+                await asyncio.wait({primary_task})
+                return primary, primary_task
+
+            _LOGGER.debug("%s slower than %.2fs on %s, hedging to %s", operation, delay, primary, secondary)
+            self.stats.record_hedge(operation)
+            hedge_task = asyncio.ensure_future(self._async_send(secondary, *request))
+            tasks[hedge_task] = secondary
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    endpoint = tasks[task]
+                    failed = task.exception() is not None or task.result()[0] >= 500
+                    if failed and pending:
+                        # 限流排队超时不是端点故障，只归还试探名额
+                        if isinstance(task.exception(), UpdateFailed):
+                            self._breaker(endpoint).release()
+                        else:
+                            self._breaker(endpoint).record_failure()
+                        continue
+                    if not failed and endpoint == secondary:
+                        self.stats.record_hedge_win(operation)
+                    return endpoint, task
+        finally:
+            for task, endpoint in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self._breaker(endpoint).release()
+
+    async def _async_send(self, base_url, method, path, params, json_payload, content_type):
+        """Send one request to an endpoint, re-logging in once on 401.
+
+        Every send first takes a token from the endpoint's read or write
+        bucket, queueing up to RATE_LIMIT_QUEUE_TIMEOUT seconds for one.
+        """
+        operation = path.rsplit("/", 1)[-1]
+        for attempt in range(2):
+            await self._async_rate_limit(base_url, method, operation)
+            token = self.token
+            headers = {"x-access-token": token, **APP_HEADERS}
+            if content_type:
+                headers["Content-Type"] = content_type
+            url = f"{base_url}{path}"
+
+            trace_ctx = {}
+            start = time.monotonic()
+            try:
+                async with async_timeout.timeout(REQUEST_TIMEOUT):
+                    async with self._session.request(
+                        method, url, params=params, json=json_payload, headers=headers,
+                        trace_request_ctx=trace_ctx,
+                    ) as response:
+                        if _LOGGER.isEnabledFor(logging.DEBUG):
+                            _LOGGER.debug("%s %s response status: %d", method, path, response.status)
+                            _LOGGER.debug("%s %s response headers: %s", method, path, dict(response.headers))
+                        # 只读取一次原始字节，解码由调用方完成
+                        body = await response.read()
+            except Exception:
+                self.stats.record(base_url, operation, (time.monotonic() - start) * 1000, False)
+                raise
+            elapsed_ms = (time.monotonic() - start) * 1000
+            self.stats.record(base_url, operation, elapsed_ms, response.status < 400)
+            if "record" in trace_ctx:
+                # 包含解码等客户端自身处理的总耗时
+                trace_ctx["record"]["client_ms"] = round(elapsed_ms, 1)
+
+            if response.status == 401 and attempt == 0:
+                # Token expired, re-login and retry once
+                _LOGGER.warning("Token expired during %s %s, attempting re-login.", method, path)
+                await self.async_login(stale_token=token)
+                continue
+            return response.status, body
+
+    async def async_get_devices(self):
+        """Get all devices for the account."""
+        try:
+            async with async_timeout.timeout(30):
+                # 以请求发出的时刻作为数据时间，不会晚于其中任何状态
+                requested_at = time.monotonic()
+                status, body = await self.async_request("GET", "/customer/devices")
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug("Devices response text (first 500 chars): %s", _preview(body))
+
+                if status == 200:
+                    # 手动解析JSON，忽略错误的Content-Type头
+                    try:
+                        raw_devices = decode_json(body)
+                    except json.JSONDecodeError as ex:
+                        # 真正的非JSON响应
+                        _LOGGER.error("Devices API returned invalid JSON. Response (first 1000 chars): %s", _preview(body, 1000))
+                        raise Exception(f"Devices API returned invalid JSON: {ex}")
+                    # 只保留用到的字段，批量缓存不持有完整记录
+                    devices = [project(device) for device in raw_devices if isinstance(device, dict)]
+                    self.devices = devices
+                    self._devices_by_mac = {device.get("mac"): device for device in devices}
+                    self._devices_fetched_at = requested_at
+                    _LOGGER.debug("Got devices: %s", devices)
+                    return devices
+
+                response_text = _preview(body)
+                _LOGGER.error("Failed to get devices, status %d: %s", status, response_text)
+                raise Exception(f"Failed to get devices: Status {status}, Response: {response_text}")
+        except Exception as err:
+            _LOGGER.error("Error getting devices: %s", err, exc_info=True)
+            raise
+
+    async def async_get_account_devices(self, max_age):
+        """Return the account's devices by MAC, fetched at most once per max_age.
+
+        Every coordinator of the account calls this on its own schedule; the
+        first caller in a window makes the request and the rest reuse it.
+        """
+        async with self._devices_lock:
+            fetched_at = self._devices_fetched_at
+            if fetched_at is None or time.monotonic() - fetched_at >= max_age:
+                await self.async_get_devices()
+            return self._devices_by_mac
+
+    @property
+    def devices_fetched_at(self):
+        """Return when (monotonic) the cached device list was requested, or None."""
+        return self._devices_fetched_at
+
+    @callback
+    def async_invalidate_devices(self):
+        """Force the next bulk poll to hit the API, e.g. after a command."""
+        self._devices_fetched_at = None
+
+    async def async_get_device_status(self, mac, hedge=False):
+        """Get the used fields of one MAC's status; the read is idempotent and may be hedged."""
+        # 使用抓包数据中的正确端点，通过查询参数传递mac
+        status, body = await self.async_request(
+            "GET", "/device/getDeviceByMac", params={"mac": mac}, hedge=hedge
+        )
+        if status == 200:
+            # 手动解析JSON，因为API返回的Content-Type可能不正确
+            return project(decode_json(body))
+
+        response_text = _preview(body)
+        _LOGGER.error("Failed to get device status for MAC %s, status %d: %s", mac, status, response_text)
+        raise UpdateFailed(f"Failed to get device status: Status {status}, Response: {response_text}")
+
+    async def async_control(self, control_payload):
+        """Send a control payload.
+
+        Writes are never hedged: a cancelled duplicate could still be
+        applied by the server after a newer write. Returns whether the
+        device accepted it, plus the decoded response body when it is a
+        JSON object.
+        """
+        status, body = await self.async_request(
+            "PUT",
+            "/wifiyuba/yuBaControl",
+            json_payload=control_payload,
+            content_type="application/json; charset=utf-8",
+        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Control command response: %d, %s", status, _preview(body))
+        if status == 200:
+            try:
+                data = decode_json(body)
+            except ValueError:
+                data = None
+            return True, project(data) if isinstance(data, dict) else None
+
+        _LOGGER.error("Control command failed for MAC %s, status %d: %s",
+                      control_payload.get("mac"), status, _preview(body))
+        return False, None
+
+    @callback
+    def async_subscribe_events(self, mac, event_callback):
+        """Receive pushed device records for ``mac`` from the account's event stream.
+
+        ``event_callback`` gets each projected record, or None whenever the
+        stream connects or drops. The stream starts with the first
+        subscriber and stops with the last. Returns an unsubscribe callback.
+        """
+        self._event_subscribers.setdefault(mac, []).append(event_callback)
+        if self._event_task is None or self._event_task.done():
+            self._event_task = asyncio.ensure_future(self._async_run_event_stream())
+
+        @callback
+        def unsubscribe():
+            callbacks = self._event_subscribers.get(mac, [])
+            if event_callback in callbacks:
+                callbacks.remove(event_callback)
+            if not callbacks:
+                self._event_subscribers.pop(mac, None)
+            if not self._event_subscribers and self._event_task is not None:
+                self._event_task.cancel()
+                self._event_task = None
+
+        return unsubscribe
+
+    def _set_events_connected(self, connected):
+        if connected == self.events_connected:
+            return
+        self.events_connected = connected
+        for callbacks in list(self._event_subscribers.values()):
+            for event_callback in list(callbacks):
+                event_callback(None)
+
+    async def _async_run_event_stream(self):
+        """Keep the server-sent event stream open, reconnecting with backoff.
+
+        The stream never logs in itself: it waits for the token obtained by
+        polling, and stops for good when the endpoint does not exist.
+        """
+        delay = EVENT_RECONNECT_MIN_DELAY
+        while True:
+            try:
+                if self.token and self.token != self._event_rejected_token:
+                    established = await self._async_read_event_stream()
+                    if established is None:
+                        _LOGGER.warning("No event stream for %s, staying on polling", self.username)
+                        self._set_events_connected(False)
+                        return
+                    if established:
+                        delay = EVENT_RECONNECT_MIN_DELAY
+            except asyncio.CancelledError:
+                self.events_connected = False
+                raise
+            except Exception as err:
+                _LOGGER.debug("Event stream for %s failed: %r", self.username, err)
+            self._set_events_connected(False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EVENT_RECONNECT_MAX_DELAY)
+
+    async def _async_read_event_stream(self):
+        """Read one connection of the event stream.
+
+        Returns whether it was established, or None when the endpoint does
+        not exist.
+        """
+        token = self.token
+        headers = {"x-access-token": token, "Accept": "text/event-stream", **APP_HEADERS}
+        # 长连接不设总超时；服务器定期发送心跳，超过空闲时间视为断开
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=EVENT_STREAM_IDLE_TIMEOUT)
+        endpoint = self.active_endpoint
+        await self._async_rate_limit(endpoint, "GET", "events")
+        async with self._session.get(f"{endpoint}/events", headers=headers, timeout=timeout) as response:
+            if response.status == 404:
+                return None
+            if response.status == 401:
+                # 登录受限流保护，留给轮询的 401 处理重新登录
+                self._event_rejected_token = token
+                return False
+            if response.status != 200:
+                _LOGGER.debug("Event stream for %s returned %d", self.username, response.status)
+                return False
+            self._set_events_connected(True)
+            data = []
+            async for line in response.content:
+                line = line.rstrip(b"\r\n")
+                if line.startswith(b"data:"):
+                    data.append(line[5:].lstrip())
+                elif not line and data:
+                    self._dispatch_event(b"\n".join(data))
+                    data = []
+        return True
+
+    def _dispatch_event(self, body):
+        try:
+            record = decode_json(body)
+        except ValueError:
+            _LOGGER.debug("Ignoring undecodable event: %s", _preview(body))
+            return
+        if not isinstance(record, dict):
+            return
+        for event_callback in list(self._event_subscribers.get(record.get("mac"), ())):
+            event_callback(project(record))
+
+    async def async_close(self):
+        """Close the shared aiohttp session."""
+        if self._unsub_reprobe is not None:
+            self._unsub_reprobe()
+            self._unsub_reprobe = None
+        for task in self._probe_tasks:
+            task.cancel()
+        if self._event_task is not None:
+            self._event_task.cancel()
+            self._event_task = None
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+def decode_json(body: bytes):
+    """Decode a JSON response body straight from bytes.
+
+    Raises ``json.JSONDecodeError`` (orjson's error subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _preview(body: bytes, limit=500):
+    """Return the start of a response body as text, for log and error messages."""
+    return body[:limit].decode("utf-8", "replace")
+
+
+@callback
+def async_acquire_client(hass: HomeAssistant, entry_id, username, password) -> ZinguoApiClient:
+    """Return the shared client for an account, creating it on first use."""
+    clients = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_CLIENTS, {})
+    client = clients.get(username)
+    if client is None:
+        client = clients[username] = ZinguoApiClient(
+            username, password, token_store=async_get_token_store(hass)
+        )
+        client.async_start(hass)
+    elif client.password != password:
+        # 重新配置后密码变化，下次 401 时使用新密码登录
+        client.password = password
+    client._entry_ids[entry_id] = None
+    return client
+
+
+async def async_release_client(hass: HomeAssistant, entry_id, username) -> None:
+    """Drop an entry's reference and close the client after the last one."""
+    clients = hass.data.get(DOMAIN, {}).get(DATA_CLIENTS, {})
+    client = clients.get(username)
+    if client is None:
+        return
+    primary = client.primary_entry_id
+    client._entry_ids.pop(entry_id, None)
+    if not client._entry_ids:
+        clients.pop(username)
+        await client.async_close()
+    elif client.primary_entry_id != primary:
+        # 账号级实体随主条目卸载，由新的主条目重新创建
+        async_dispatcher_send(hass, SIGNAL_PRIMARY_ENTRY_CHANGED.format(username))
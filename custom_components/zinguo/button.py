@@ -1,15 +1,14 @@
 """Button platform for Zinguo."""
 import logging
-from typing import Any
 
 from homeassistant.components.button import ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import ZinguoDataUpdateCoordinator
+from .entity import ZinguoEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,32 +19,23 @@ async def async_setup_entry(
 ) -> None:
     """Set up the Zinguo button platform."""
     coordinator: ZinguoDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-    device_info = coordinator.data
 
     entities = []
-    entities.append(ZinguoTurnOffAllButton(coordinator, device_info))
+    entities.append(ZinguoTurnOffAllButton(coordinator))
 
     async_add_entities(entities)
 
 
-class ZinguoTurnOffAllButton(CoordinatorEntity, ButtonEntity):
+class ZinguoTurnOffAllButton(ZinguoEntity, ButtonEntity):
     """Representation of a Zinguo turn-off-all button."""
 
-    def __init__(self, coordinator: ZinguoDataUpdateCoordinator, device_info: dict[str, Any]):
+    def __init__(self, coordinator: ZinguoDataUpdateCoordinator):
         """Initialize the button."""
-        super().__init__(coordinator)
-        self._device_info = device_info
-        self._attr_unique_id = f"{device_info['id']}_turn_off_all_button"
+        # 按钮没有状态，不订阅任何字段，只在可用性变化时刷新
+        super().__init__(coordinator, frozenset())
+        self._attr_unique_id = f"{coordinator.device_id}_turn_off_all_button"
         self._attr_name = "全关"
-        # 限制设备名称长度，避免实体名称过长
-        device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device_info["id"])},
-            "name": device_name,
-            "manufacturer": "Zinguo",
-            "model": device_info.get("deviceModel", "智能浴霸"),
-            "sw_version": device_info.get("firmwareVersion", "Unknown Version"),
-        }
+        self._attr_device_info = coordinator.device_info
 
     async def async_press(self) -> None:
         """Handle the button press."""
@@ -5,11 +5,30 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import ConfigEntryNotReady
 from .const import DOMAIN, CONF_USERNAME, CONF_PASSWORD, CONF_MAC, CONF_NAME # 导入常量
-from .coordinator import ZinguoDataUpdateCoordinator # 导入协调器
+from .const import (
+    CONF_ACTIVE_INTERVAL,
+    CONF_BULK_POLLING,
+    CONF_COMMAND_WINDOW,
+    CONF_DEVICE_ID,
+    CONF_HEDGING,
+    CONF_IDLE_AFTER,
+    CONF_IDLE_INTERVAL,
+    CONF_OFFLINE_INTERVAL,
+    CONF_TEMPERATURE_WINDOW,
+    DEFAULT_ACTIVE_INTERVAL,
+    DEFAULT_BULK_POLLING,
+    DEFAULT_COMMAND_WINDOW,
+    DEFAULT_HEDGING,
+    DEFAULT_IDLE_AFTER,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_OFFLINE_INTERVAL,
+    DEFAULT_TEMPERATURE_WINDOW,
+)
+from .api import ZinguoApiClient, async_get_token_store
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,6 +37,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> config_entries.OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -25,19 +50,23 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors: dict[str, str] = {}
         if user_input is not None:
             try:
-                # 使用协调器获取设备列表
-                coordinator = ZinguoDataUpdateCoordinator(
-                    self.hass,
-                    username=user_input[CONF_USERNAME],
-                    password=user_input[CONF_PASSWORD]
+                # 使用临时客户端获取设备列表；登录得到的 token 写入缓存，
+                # 新条目启动时直接复用，无需再次登录
+                client = ZinguoApiClient(
+                    user_input[CONF_USERNAME],
+                    user_input[CONF_PASSWORD],
+                    token_store=async_get_token_store(self.hass),
+                    reuse_cached_token=False,
                 )
                 # 获取设备列表
                 try:
-                    devices = await coordinator.async_get_devices()
+                    devices = await client.async_get_devices()
                     _LOGGER.debug("Got devices: %s", devices)
                 except Exception as ex:
                     _LOGGER.error("Failed to get devices: %s", ex, exc_info=True)
                     raise
+                finally:
+                    await client.async_close()
                 
                 # 保存凭据以便后续步骤使用
                 self._credentials = user_input
@@ -50,7 +79,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         data={
                             **user_input,
                             CONF_MAC: device.get("mac"),
-                            CONF_NAME: device.get("name", "Zinguo Device")
+                            CONF_NAME: device.get("name", "Zinguo Device"),
+                            CONF_DEVICE_ID: device.get("_id"),
                         }
                     )
                 
@@ -88,7 +118,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     data={
                         **self._credentials,
                         CONF_MAC: selected_device.get("mac"),
-                        CONF_NAME: selected_device.get("name", "Zinguo Device")
+                        CONF_NAME: selected_device.get("name", "Zinguo Device"),
+                        CONF_DEVICE_ID: selected_device.get("_id"),
                     }
                 )
             
@@ -121,25 +152,30 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             try:
                 # --- 修改开始 ---
-                # 使用协调器中的验证逻辑
-                coordinator = ZinguoDataUpdateCoordinator(
-                    self.hass,
-                    username=user_input[CONF_USERNAME],
-                    password=user_input[CONF_PASSWORD]
+                # 使用临时客户端验证凭据：尝试获取设备列表
+                client = ZinguoApiClient(
+                    user_input[CONF_USERNAME],
+                    user_input[CONF_PASSWORD],
+                    token_store=async_get_token_store(self.hass),
+                    reuse_cached_token=False,
                 )
-                # 验证凭据：尝试获取设备列表
-                devices = await coordinator.async_get_devices()
+                try:
+                    devices = await client.async_get_devices()
+                finally:
+                    await client.async_close()
                 
                 # 如果有设备，使用第一个设备的信息
                 if devices:
                     title = devices[0].get("name", "Zinguo Device")
                     mac = devices[0].get("mac")
                     name = devices[0].get("name", "Zinguo Device")
+                    device_id = devices[0].get("_id")
                 else:
                     title = "Zinguo Device"
                     # 保留原有设备的mac和name
                     mac = entry.data.get(CONF_MAC, "")
                     name = entry.data.get(CONF_NAME, "Zinguo Device")
+                    device_id = entry.data.get(CONF_DEVICE_ID)
                 # --- 修改结束 ---
 
                 # 更新现有条目，包含所有必要字段
@@ -148,7 +184,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     data={
                         **user_input,
                         CONF_MAC: mac,
-                        CONF_NAME: name
+                        CONF_NAME: name,
+                        CONF_DEVICE_ID: device_id,
                     }, 
                     title=title
                 )
@@ -175,3 +212,59 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             ),
             errors=errors,
         )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Zinguo options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage polling and command options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_ACTIVE_INTERVAL,
+                        default=options.get(CONF_ACTIVE_INTERVAL, DEFAULT_ACTIVE_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+                    vol.Required(
+                        CONF_IDLE_INTERVAL,
+                        default=options.get(CONF_IDLE_INTERVAL, DEFAULT_IDLE_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=10, max=3600)),
+                    vol.Required(
+                        CONF_OFFLINE_INTERVAL,
+                        default=options.get(CONF_OFFLINE_INTERVAL, DEFAULT_OFFLINE_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=30, max=3600)),
+                    vol.Required(
+                        CONF_IDLE_AFTER,
+                        default=options.get(CONF_IDLE_AFTER, DEFAULT_IDLE_AFTER),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(
+                        CONF_BULK_POLLING,
+                        default=options.get(CONF_BULK_POLLING, DEFAULT_BULK_POLLING),
+                    ): bool,
+                    vol.Required(
+                        CONF_COMMAND_WINDOW,
+                        default=options.get(CONF_COMMAND_WINDOW, DEFAULT_COMMAND_WINDOW),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=2)),
+                    vol.Required(
+                        CONF_HEDGING,
+                        default=options.get(CONF_HEDGING, DEFAULT_HEDGING),
+                    ): bool,
+                    vol.Required(
+                        CONF_TEMPERATURE_WINDOW,
+                        default=options.get(CONF_TEMPERATURE_WINDOW, DEFAULT_TEMPERATURE_WINDOW),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+                }
+            ),
+        )
@@ -1,4 +1,5 @@
 """Constants for Zinguo integration."""
+from datetime import timedelta
 
 DOMAIN = "zinguo"
 
@@ -7,6 +8,98 @@ CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_MAC = "mac"
 CONF_NAME = "name"
+# 云端设备 _id，用作设备注册表标识；保存在条目中，启动时无需等待云端
+CONF_DEVICE_ID = "device_id"
+
+# Options
+CONF_BULK_POLLING = "bulk_polling"
+DEFAULT_BULK_POLLING = True
+
+CONF_COMMAND_WINDOW = "command_window"
+DEFAULT_COMMAND_WINDOW = 0.15
+
+# Request hedging: when the preferred endpoint has not answered after the
+# recent p95 latency (clamped to HEDGE_MIN_DELAY..HEDGE_MAX_DELAY seconds),
+# send the same request to the next endpoint and take the first success.
+# Only status reads are hedged; control writes are never sent twice
+CONF_HEDGING = "hedging"
+DEFAULT_HEDGING = False
+HEDGE_QUANTILE = 0.95
+HEDGE_DEFAULT_DELAY = 1.0
+HEDGE_MIN_DELAY = 0.2
+HEDGE_MAX_DELAY = 5.0
+
+# Push transport: a server-sent event stream (one long-lived connection per
+# account) with polling kept as a slow fallback. The vendor cloud has no such
+# stream, so it is only used against the fake cloud; entries always poll.
+PUSH_FALLBACK_INTERVAL = 300
+EVENT_STREAM_IDLE_TIMEOUT = 90
+EVENT_RECONNECT_MIN_DELAY = 1
+EVENT_RECONNECT_MAX_DELAY = 60
+
+# Adaptive polling tiers (seconds): fast while heating/wind/ventilation runs
+# and for CONF_IDLE_AFTER seconds afterwards, slow once idle, floor rate while
+# the device reports offline
+POLL_TIER_ACTIVE = "active"
+POLL_TIER_IDLE = "idle"
+POLL_TIER_OFFLINE = "offline"
+
+CONF_ACTIVE_INTERVAL = "active_interval"
+CONF_IDLE_INTERVAL = "idle_interval"
+CONF_OFFLINE_INTERVAL = "offline_interval"
+CONF_IDLE_AFTER = "idle_after"
+DEFAULT_ACTIVE_INTERVAL = 10
+DEFAULT_IDLE_INTERVAL = 30
+DEFAULT_OFFLINE_INTERVAL = 300
+DEFAULT_IDLE_AFTER = 300
+
+# Pseudo data key notified to listeners when the polling tier changes
+POLL_TIER_KEY = "pollTier"
+
+# Temperature history: samples kept in memory per device, and the window
+# (minutes) for the heating rate and rolling min/max/mean sensors
+TEMPERATURE_HISTORY_SIZE = 720
+CONF_TEMPERATURE_WINDOW = "temperature_window"
+DEFAULT_TEMPERATURE_WINDOW = 10
+# Pseudo data key notified to listeners when a temperature sample is added
+TEMPERATURE_HISTORY_KEY = "temperatureHistory"
+
+ACTIVITY_KEYS = ["warmingSwitch1", "warmingSwitch2", "windSwitch", "ventilationSwitch"]
+
+# Auto-close countdowns: channel -> (switches that run it, countdown minutes
+# parameter). The remaining time is computed locally from when the channel
+# was seen turning on; one refresh is requested COUNTDOWN_REFRESH_GRACE
+# seconds after it expires.
+COUNTDOWN_CHANNELS = {
+    "warming": (("warmingSwitch1", "warmingSwitch2"), "warmingAutoClose"),
+    "ventilation": (("ventilationSwitch",), "ventilationAutoClose"),
+}
+COUNTDOWN_REFRESH_GRACE = 2
+
+# Background confirmation after a control command: re-poll delays (seconds,
+# doubling) until the device reports the requested state or the deadline passes
+CONFIRM_INITIAL_DELAY = 0.3
+CONFIRM_MAX_DELAY = 2.0
+CONFIRM_DEADLINE = 10
+
+# Number of recent requests kept with phase timings for diagnostics
+TRACE_BUFFER_SIZE = 100
+
+# hass.data[DOMAIN] key for the account-level API client registry
+DATA_CLIENTS = "clients"
+DATA_TOKEN_STORE = "token_store"
+# Dispatcher signal (formatted with the username) sent when another entry
+# becomes the account's primary entry and takes over the account entities
+SIGNAL_PRIMARY_ENTRY_CHANGED = f"{DOMAIN}_primary_entry_changed_{{}}"
+
+# Persistent storage (.storage/zinguo.tokens)
+STORAGE_VERSION = 1
+STORAGE_KEY_TOKENS = f"{DOMAIN}.tokens"
+TOKEN_SAVE_DELAY = 1
+# Last-known device state per entry, restored at startup until the first
+# live refresh; writes are debounced (seconds)
+STORAGE_KEY_SNAPSHOT = f"{DOMAIN}.snapshot"
+SNAPSHOT_SAVE_DELAY = 30
 
 # API configuration - Multiple endpoints for fallback
 API_ENDPOINTS = [
@@ -14,6 +107,37 @@ API_ENDPOINTS = [
     "https://iot2.zinguo.com/api/v1"
 ]
 
+# Endpoint probing: per-endpoint timeout, background re-probe period and how
+# much faster another endpoint must be before traffic moves to it
+ENDPOINT_PROBE_TIMEOUT = 10
+ENDPOINT_REPROBE_INTERVAL = timedelta(minutes=10)
+ENDPOINT_SWITCH_RATIO = 0.7
+
+# Request resilience: per-attempt timeout, retries with jittered exponential
+# backoff limited by a retry budget (retry tokens earned per request), and a
+# per-endpoint circuit breaker that opens after consecutive failures
+REQUEST_TIMEOUT = 10
+REQUEST_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 2.0
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MAX_TOKENS = 10
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 30
+BREAKER_MAX_RESET_TIMEOUT = 300
+
+# Outbound rate limit per account and endpoint: token buckets (requests per
+# second, burst size) with separate budgets for status reads and control
+# writes. Requests over budget queue for up to RATE_LIMIT_QUEUE_TIMEOUT
+# seconds before failing.
+RATE_LIMIT_READ = "read"
+RATE_LIMIT_WRITE = "write"
+RATE_LIMITS = {RATE_LIMIT_READ: (5.0, 10), RATE_LIMIT_WRITE: (2.0, 5)}
+RATE_LIMIT_QUEUE_TIMEOUT = 10
+# Window (seconds) of the recent rate-limit wait reported by the sensors;
+# the lifetime maximum stays in diagnostics
+RATE_LIMIT_WAIT_WINDOW = 300
+
 # Default endpoint (will be updated by coordinator if another works better)
 BASE_URL = API_ENDPOINTS[0]
 LOGIN_URL = f"{BASE_URL}/customer/login"
@@ -21,6 +145,22 @@ DEVICES_URL = f"{BASE_URL}/customer/devices"
 GET_DEVICE_URL = f"{BASE_URL}/device/getDeviceByMac"
 CONTROL_URL = f"{BASE_URL}/wifiyuba/yuBaControl"
 
+# Control payload keys: switch writes and parameter writes (setParamter) are
+# separate requests
+SWITCH_KEYS = ["warmingSwitch1", "warmingSwitch2", "windSwitch", "lightSwitch", "ventilationSwitch"]
+PARAM_KEYS = ["ventilationAutoClose", "warmingAutoClose", "overHeatAutoClose", "lightAutoClose", "comovement", "motoVersion"]
+
+# Services
+SERVICE_APPLY_STATE = "apply_state"
+SERVICE_RUN_COMMAND = "run_command"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_RESTORE = "restore"
+# 批量服务同时在途的设备数
+DEFAULT_FLEET_CONCURRENCY = 4
+MAX_FLEET_CONCURRENCY = 20
+# 可由 apply_state 设置的参数；comovement/motoVersion 随参数写入自动携带
+APPLY_STATE_PARAM_KEYS = ["ventilationAutoClose", "warmingAutoClose", "overHeatAutoClose", "lightAutoClose"]
+
 # Switch types
 SWITCH_TYPES = {
     "light": {
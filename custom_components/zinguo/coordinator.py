@@ -1,379 +1,499 @@
 """DataUpdateCoordinator for Zinguo integration."""
+import asyncio
 import logging
-import json
+import time
 from datetime import timedelta
 
 import aiohttp
 import async_timeout # Added missing import
+from homeassistant.core import callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.exceptions import ConfigEntryAuthFailed # Added for better auth handling
+from homeassistant.util import dt as dt_util
+from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError # Added for better auth handling
 
+from .api import ZinguoApiClient
 from .const import (
-    LOGIN_URL,
-    DEVICES_URL,
-    GET_DEVICE_URL,
-    CONTROL_URL
+    ACTIVITY_KEYS,
+    CONFIRM_DEADLINE,
+    CONFIRM_INITIAL_DELAY,
+    CONFIRM_MAX_DELAY,
+    COUNTDOWN_CHANNELS,
+    COUNTDOWN_REFRESH_GRACE,
+    DEFAULT_ACTIVE_INTERVAL,
+    DEFAULT_IDLE_AFTER,
+    DEFAULT_IDLE_INTERVAL,
+    DEFAULT_OFFLINE_INTERVAL,
+    DEFAULT_TEMPERATURE_WINDOW,
+    DOMAIN,
+    PARAM_KEYS,
+    POLL_TIER_ACTIVE,
+    POLL_TIER_KEY,
+    POLL_TIER_IDLE,
+    POLL_TIER_OFFLINE,
+    PUSH_FALLBACK_INTERVAL,
+    SNAPSHOT_SAVE_DELAY,
+    SWITCH_KEYS,
+    TEMPERATURE_HISTORY_KEY,
 )
+from .history import TemperatureHistory
+from .state import DEFAULT_MODEL, SWITCH_ENCODING, DeviceState, diff
+from .transport import CloudPollingTransport, ZinguoTransport
 
 _LOGGER = logging.getLogger(__name__)
 
 class ZinguoDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Zinguo data."""
 
-    def __init__(self, hass, username, password, mac=None, name=None):
+    def __init__(self, hass, username, password, mac=None, name=None, client=None, bulk_polling=False,
+                 command_window=0, poll_intervals=None, idle_after=DEFAULT_IDLE_AFTER, hedging=False,
+                 device_id=None, snapshot_store: Store | None = None, transport: ZinguoTransport | None = None,
+                 temperature_window=DEFAULT_TEMPERATURE_WINDOW):
         """Initialize."""
+        # 自适应轮询：各档位的轮询间隔（秒）
+        self.poll_intervals = {
+            POLL_TIER_ACTIVE: DEFAULT_ACTIVE_INTERVAL,
+            POLL_TIER_IDLE: DEFAULT_IDLE_INTERVAL,
+            POLL_TIER_OFFLINE: DEFAULT_OFFLINE_INTERVAL,
+            **(poll_intervals or {}),
+        }
+        self.idle_after = idle_after
+        self.poll_tier = POLL_TIER_IDLE
+        self._last_active = None
+        # 按键分发：记录上次通知时的状态，只唤醒订阅了变化字段的监听器
+        self._notified_data = None
+        self._notified_available = None
+        self._notified_tier = None
+        self._notified_stale = None
+        self._notified_samples = 0
+        # 最近一次通知时变化的字段（首次数据或可用性变化时为 None）
+        self.last_changes: frozenset | None = None
+        # 已同步到设备注册表的 (型号, 固件版本)
+        self._registered_info = None
         super().__init__(
             hass,
             _LOGGER,
             name=name or "Zinguo",
-            update_interval=timedelta(seconds=30), # Changed back from 300 to 30 for more frequent updates, adjust as needed
+            update_interval=timedelta(seconds=self.poll_intervals[POLL_TIER_IDLE]),
         )
         # Use 'username' to match CONF_USERNAME from const.py
         self.username = username
         self.password = password
         self.mac = mac
-        self.token = None
-        # API endpoint management
-        self._base_url = None  # Will be set during login
-        # 创建共享会话，禁用SSL验证以解决证书过期问题
-        conn = aiohttp.TCPConnector(ssl=False)
-        self._session = aiohttp.ClientSession(connector=conn)
-        self.devices = [] # Store devices list for config flow
-
-    async def _test_endpoint(self, base_url):
-        """Test if a given API endpoint is working by attempting login."""
-        import hashlib
-        encrypted_password = hashlib.sha1(self.password.encode()).hexdigest()
-        
-        payload = {
-            "account": self.username,
-            "password": encrypted_password
-        }
-
-        headers = {
-            "Content-Type": "text/plain;charset=UTF-8",
-            "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-            "Accept": "*/*",
-            "Accept-Language": "zh-cn",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive"
+        # 设备注册表标识：条目中保存的云端 _id，旧条目在首次刷新后补上
+        self.device_id = device_id
+        # 同一账号的所有条目共用一个客户端（会话、token、端点）；
+        # 未传入时（例如配置流程中）使用独占的客户端
+        self._owns_client = client is None
+        self.client = client or ZinguoApiClient(username, password)
+        # 读取、控制和推送订阅都经由传输层；默认为云端轮询
+        self.transport = transport or CloudPollingTransport(self.client)
+        self._unsub_transport = None
+        # 批量轮询：每个账号每个周期只请求一次 /customer/devices
+        self.bulk_polling = bulk_polling
+        # 命令合并窗口（秒）：窗口内的开关/参数修改合并为一次请求
+        self.command_window = command_window
+        self._pending_command: dict = {}
+        self._pending_futures: list[asyncio.Future] = []
+        self._unsub_flush = None
+        # 命令队列：单个工作任务按顺序逐个写入，在途期间排队的命令合并发送
+        self._command_queue: asyncio.Queue = asyncio.Queue()
+        self._command_worker: asyncio.Task | None = None
+        # 请求对冲：只对冲状态读取，控制写入从不重复发送
+        self.hedging = hedging
+        # 后台确认：等待设备上报的期望状态
+        self._confirm_expected: dict = {}
+        self._confirm_task: asyncio.Task | None = None
+        # 最近一次控制请求发出的时刻；早于它读取的状态不能覆盖乐观状态
+        self._command_sent_at = 0.0
+        # 上次的设备状态快照：启动时恢复，变化后延迟写回
+        self._snapshot_store = snapshot_store
+        self.stale = False
+        # 温度历史（仅内存）：派生传感器按窗口（分钟）计算速率和统计值
+        self.temperature_history = TemperatureHistory()
+        self.temperature_window = temperature_window
+        # 自动关闭倒计时：各通道开启的时刻，以及到期后的一次定点刷新
+        self._countdown_started: dict[str, float] = {}
+        self._unsub_countdown: dict = {}
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only the listeners subscribed to fields that changed.
+
+        A listener's context is the set of state fields it renders; listeners
+        without a context are always notified. Availability changes and the
+        first data notify everyone, as does the first live data replacing a
+        restored snapshot.
+        """
+        data = self.data
+        previous = self._notified_data
+        available = self.last_update_success
+        changed = None
+        if data and previous and available == self._notified_available and self.stale == self._notified_stale:
+            changed = diff(previous, data)
+            if self.poll_tier != self._notified_tier:
+                changed |= {POLL_TIER_KEY}
+            if self.temperature_history.samples != self._notified_samples:
+                changed |= {TEMPERATURE_HISTORY_KEY}
+        if data is not None and not self.stale:
+            self._update_countdowns(None if self._notified_stale else previous, data)
+            self._update_device_registry(data)
+        self._notified_data = data
+        self._notified_available = available
+        self._notified_tier = self.poll_tier
+        self._notified_stale = self.stale
+        self._notified_samples = self.temperature_history.samples
+        self.last_changes = changed
+        if data is not None and self._snapshot_store is not None and (changed is None or changed):
+            self._snapshot_store.async_delay_save(self._snapshot_data, SNAPSHOT_SAVE_DELAY)
+
+        for update_callback, context in list(self._listeners.values()):
+            if changed is None or context is None or not changed.isdisjoint(context):
+                update_callback()
+
+    @callback
+    def _update_device_registry(self, data):
+        """Correct the registered model and firmware from live data.
+
+        Entities register the device from the stored identity before the
+        first refresh, so the model and firmware start as placeholders.
+        """
+        info = (data.deviceModel, data.firmwareVersion)
+        if info == self._registered_info:
+            return
+        device_registry = dr.async_get(self.hass)
+        device = device_registry.async_get_device(identifiers=self.device_info["identifiers"])
+        if device is None:
+            # 实体尚未注册设备，下次更新再同步
+            return
+        if (device.model, device.sw_version) != info:
+            device_registry.async_update_device(device.id, model=info[0], sw_version=info[1])
+        self._registered_info = info
+
+    def countdown_remaining(self, channel):
+        """Return the seconds left before a channel auto-closes, or None when not counting down."""
+        started = self._countdown_started.get(channel)
+        if started is None or self.data is None:
+            return None
+        minutes = getattr(self.data, COUNTDOWN_CHANNELS[channel][1])
+        if not minutes:
+            # 0 表示不自动关闭
+            return None
+        return max(0.0, started + minutes * 60 - time.monotonic())
+
+    @callback
+    def _update_countdowns(self, previous, data):
+        """Start or clear each channel's countdown and reschedule its expiry refresh.
+
+        A countdown only starts when the channel is seen turning on; a
+        channel already running at startup has no known start time.
+        """
+        now = time.monotonic()
+        for channel, (switch_keys, _param) in COUNTDOWN_CHANNELS.items():
+            running = any(getattr(data, key) for key in switch_keys)
+            if not running:
+                self._countdown_started.pop(channel, None)
+            elif previous is not None and not any(getattr(previous, key) for key in switch_keys):
+                self._countdown_started[channel] = now
+            self._schedule_countdown_refresh(channel)
+
+    @callback
+    def _schedule_countdown_refresh(self, channel):
+        unsub = self._unsub_countdown.pop(channel, None)
+        if unsub is not None:
+            unsub()
+        remaining = self.countdown_remaining(channel)
+        # 已到期的倒计时不再重复安排，每次开启只定点刷新一次
+        if remaining:
+            self._unsub_countdown[channel] = async_call_later(
+                self.hass, remaining + COUNTDOWN_REFRESH_GRACE, self._async_countdown_expired
+            )
+
+    async def _async_countdown_expired(self, _now=None):
+        """Fetch the confirmed off-state as soon as a countdown runs out."""
+        _LOGGER.debug("Auto-close countdown of %s expired, refreshing", self.name)
+        self.client.async_invalidate_devices()
+        await self.async_refresh()
+
+    @property
+    def device_info(self):
+        """Return the device registry info, from stored identity until data arrives."""
+        data = self.data
+        return {
+            "identifiers": {(DOMAIN, self.device_id or self.mac)},
+            # 限制设备名称长度，避免实体名称过长
+            "name": self.name[:32] if self.name else "Zinguo",
+            "manufacturer": "Zinguo",
+            "model": data.deviceModel if data else DEFAULT_MODEL,
+            "sw_version": data.firmwareVersion if data else None,
         }
 
-        login_url = f"{base_url}/customer/login"
-        _LOGGER.debug("Testing endpoint: %s", base_url)
-        
+    async def async_restore_snapshot(self):
+        """Load the last saved device state as the initial data, marked stale."""
+        if self._snapshot_store is None or self.data is not None:
+            return
+        stored = await self._snapshot_store.async_load()
+        if not stored or "device" not in stored:
+            return
         try:
-            async with self._session.post(login_url, json=payload, headers=headers) as response:
-                response_text = await response.text()
-                _LOGGER.debug("Endpoint %s response status: %d", base_url, response.status)
-                
-                if response.status == 200:
-                    # Try to parse JSON to verify valid response
-                    import json
-                    data = json.loads(response_text)
-                    if "token" in data:
-                        _LOGGER.debug("Endpoint %s is working", base_url)
-                        return True, data["token"]
-                return False, None
-        except Exception as ex:
-            _LOGGER.debug("Endpoint %s test failed: %s", base_url, ex)
-            return False, None
-
-    async def _find_working_endpoint(self):
-        """Find a working API endpoint from the list."""
-        from .const import API_ENDPOINTS
-        
-        # Try each endpoint
-        for endpoint in API_ENDPOINTS:
-            is_working, token = await self._test_endpoint(endpoint)
-            if is_working:
-                _LOGGER.info("Found working endpoint: %s", endpoint)
-                return endpoint, token
-        
-        _LOGGER.error("No working API endpoint found")
-        raise Exception("No working API endpoint found")
+            self.data = DeviceState.from_dict(stored["device"])
+        except TypeError as err:
+            _LOGGER.debug("Ignoring unreadable snapshot for %s: %s", self.name, err)
+            return
+        self.stale = True
+        _LOGGER.debug("Restored %s state saved at %s", self.name, stored.get("saved_at"))
+
+    @callback
+    def _snapshot_data(self):
+        return {"device": self.data.as_dict(), "saved_at": dt_util.utcnow().isoformat()}
 
     async def async_get_devices(self):
         """Get all devices for the user. Used in config flow."""
-        try:
-            async with async_timeout.timeout(30):
-                # Login if needed
-                if not self.token:
-                    _LOGGER.debug("No token found, attempting login...")
-                    await self._login()
-                    _LOGGER.debug("Login successful, got token: %s", self.token[:10] + "..." if self.token else "None")
-
-                # Use the detected base url or fallback to const BASE_URL
-                from .const import DEVICES_URL as const_devices_url
-                from .const import BASE_URL as const_base_url
-                base_url = self._base_url if hasattr(self, '_base_url') and self._base_url else const_base_url
-                devices_url = f"{base_url}/customer/devices"
-
-                headers = {
-                    "x-access-token": self.token,
-                    "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-                    "Accept": "*/*",
-                    "Accept-Language": "zh-cn",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive"
-                }
-                
-                _LOGGER.debug("Attempting to get devices from %s", devices_url)
-                _LOGGER.debug("Devices request headers: %s", dict(headers))
-                
-                async with self._session.get(devices_url, headers=headers) as response:
-                    _LOGGER.debug("Devices response status: %d", response.status)
-                    _LOGGER.debug("Devices response headers: %s", dict(response.headers))
-                    
-                    response_text = await response.text()
-                    _LOGGER.debug("Devices response text (first 500 chars): %s", response_text[:500])
-                    
-                    if response.status == 200:
-                        # 手动解析JSON，忽略错误的Content-Type头
-                        import json
-                        try:
-                            devices = json.loads(response_text)
-                            self.devices = devices
-                            _LOGGER.debug("Got devices: %s", devices)
-                            return devices
-                        except json.JSONDecodeError as ex:
-                            # 真正的非JSON响应
-                            _LOGGER.error("Devices API returned invalid JSON. Response (first 1000 chars): %s", response_text[:1000])
-                            raise Exception(f"Devices API returned invalid JSON: {ex}")
-                    else:
-                        _LOGGER.error("Failed to get devices, status %d: %s", response.status, response_text)
-                        raise Exception(f"Failed to get devices: Status {response.status}, Response: {response_text[:500]}")
-        except Exception as err:
-            _LOGGER.error("Error getting devices: %s", err, exc_info=True)
-            raise
+        return await self.client.async_get_devices()
+
+    async def _async_update_data(self, per_mac=False):
+        """Update data via API.
 
-    async def _async_update_data(self):
-        """Update data via API."""
+        ``per_mac`` reads the device directly instead of through the
+        account's bulk cache. Data requested before the last control write
+        cannot reflect it, so the unconfirmed expected values stay on top.
+        """
         try:
             async with async_timeout.timeout(30):
-                # Login if needed
-                if not self.token:
-                    _LOGGER.debug("No token found, attempting login...")
-                    await self._login()
-                    _LOGGER.debug("Login successful, token obtained.")
-
                 # Get device status
-                device_data = await self._get_device_status()
+                device_data, fetched_at = await self._get_device_status(per_mac)
                 # Process the raw data into a format suitable for entities
-                processed_data = self._process_device_data(device_data)
+                processed_data = self._process_device_data(device_data, fetched_at)
+                if self._confirm_expected and fetched_at < self._command_sent_at:
+                    _LOGGER.debug("Status of %s predates the last command, keeping %s",
+                                  self.mac, self._confirm_expected)
+                    processed_data = processed_data.replace(**self._confirm_expected)
+                self._update_poll_tier(processed_data)
+                self.stale = False
+                self.client.stats.last_success = dt_util.utcnow()
                 _LOGGER.debug("Successfully updated device data: %s", processed_data)
                 return processed_data
 
         except ConfigEntryAuthFailed as err:
             # If authentication fails during an update, clear the token and re-raise
             _LOGGER.error("Authentication failed during update: %s", err)
-            self.token = None
+            self.client.token = None
             raise
         except Exception as err:
             _LOGGER.error("Error updating Zinguo data: %s", err, exc_info=True)
             # Try to re-login on error, especially for 401 or token-related issues
             if isinstance(err, aiohttp.ClientResponseError) and err.status == 401:
                 _LOGGER.debug("Got 401 during update, clearing token for re-login.")
-                self.token = None
+                self.client.token = None
             # Don't raise ConfigEntryAuthFailed for non-auth errors, just UpdateFailed
             raise UpdateFailed(f"Error communicating with API: {err}")
 
-    def _process_device_data(self, raw_data: dict) -> dict:
-        """Process raw device data into a standardized format for entities."""
-        # Define mapping for switch states based on actual device response
-        # From test results, device uses:
-        # 1: ON, 2: OFF
-        status_map = {1: True, 2: False}
-        
-        # Device model mapping based on API response from /devicetype/listAll
-        device_model_map = {
-            "M1": "门窗报警器M2/M2S",
-            "W1": "智能网关W1",
-            "K2": "墙壁开关K2",
-            "K2G": "开关群组K2G",
-            "B2": "浴霸开关B2",
-            "C2": "墙壁插座C2/C2S",
-            "T2": "智能窗帘T2",
-            "S2": "情景面板S2",
-            "H2": "控制盒H2/H2S",
-            "G6": "迎宾广告机G6"
-        }
-        
-        # Get raw model code from device data
-        raw_model = raw_data.get("model", "")
-        # Map to human-readable name if available, otherwise use default
-        device_model = device_model_map.get(raw_model, "智能浴霸")
-
-        # Only extract and process the fields we actually need
-        processed = {
-            "id": raw_data.get("_id"),
-            "mac": raw_data.get("mac"),
-            "name": raw_data.get("name"),
-            "online": raw_data.get("online"),
-            "temperature": raw_data.get("temperature"),
-            "lightSwitch": status_map.get(raw_data.get("lightSwitch"), False),
-            "warmingSwitch1": status_map.get(raw_data.get("warmingSwitch1"), False),
-            "warmingSwitch2": status_map.get(raw_data.get("warmingSwitch2"), False),
-            "windSwitch": status_map.get(raw_data.get("windSwitch"), False),
-            "ventilationSwitch": status_map.get(raw_data.get("ventilationSwitch"), False),
-            "ventilationAutoClose": raw_data.get("ventilationAutoClose"),
-            "overHeatAutoClose": raw_data.get("overHeatAutoClose"),
-            "warmingAutoClose": raw_data.get("warmingAutoClose"),
-            "lightAutoClose": raw_data.get("lightAutoClose"),
-            "comovement": raw_data.get("comovement"),
-            "hardwareVersion": raw_data.get("hardwareVersion"),
-            "softwareVersion": raw_data.get("softwareVersion"),
-            "deviceModel": device_model,
-            "firmwareVersion": raw_data.get("softwareVersion", "Unknown")
-        }
+    def _update_poll_tier(self, data):
+        """Pick the polling tier from the device activity and apply its interval."""
+        now = time.monotonic()
+        if data.online == 0:
+            tier = POLL_TIER_OFFLINE
+        elif any(getattr(data, key) for key in ACTIVITY_KEYS):
+            self._last_active = now
+            tier = POLL_TIER_ACTIVE
+        elif self._last_active is not None and now - self._last_active < self.idle_after:
+            # 刚关闭时保持快速轮询，及时反映倒计时结束等变化
+            tier = POLL_TIER_ACTIVE
+        else:
+            tier = POLL_TIER_IDLE
+
+        if tier != self.poll_tier:
+            _LOGGER.debug("%s polling tier %s -> %s", self.name, self.poll_tier, tier)
+            self.poll_tier = tier
+        interval = self.poll_intervals[tier]
+        if self.transport.connected:
+            # 推送连接正常时轮询只作兜底
+            interval = max(interval, PUSH_FALLBACK_INTERVAL)
+        self.update_interval = timedelta(seconds=interval)
+
+    def _process_device_data(self, raw_data: dict, fetched_at=None) -> DeviceState:
+        """Process raw device data into the state the entities render.
+
+        ``fetched_at`` is when (monotonic) the record was requested from the
+        cloud; records pushed or returned by a control call are taken as now.
+        """
+        processed = DeviceState.from_raw(raw_data)
         _LOGGER.debug("Processed device data: %s", processed)
+        # 每次云端读取都是一个温度样本，温度不变也记录；样本按读取时间
+        # 记录，重复读到的批量缓存不会被当作新样本
+        if processed.temperature is not None:
+            try:
+                self.temperature_history.add(
+                    time.monotonic() if fetched_at is None else fetched_at, float(processed.temperature)
+                )
+            except (TypeError, ValueError):
+                pass
         return processed
 
-    async def _login(self):
-        """Login to Zinguo API using endpoint detection."""
-        # 根据抓包数据，密码需要进行SHA-1加密
-        import hashlib
-        encrypted_password = hashlib.sha1(self.password.encode()).hexdigest()
-        
-        # Find a working endpoint first
-        if not self._base_url:
-            self._base_url, self.token = await self._find_working_endpoint()
-            _LOGGER.debug("Login using detected endpoint: %s", self._base_url)
-            return  # Token already obtained from _find_working_endpoint
-        
-        # If we already have a base_url, use it directly
-        payload = {
-            "account": self.username, # Use the corrected instance variable
-            "password": encrypted_password
-        }
-
-        # 添加适当的请求头，模拟手机APP行为
-        headers = {
-            "Content-Type": "text/plain;charset=UTF-8",
-            "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-            "Accept": "*/*",
-            "Accept-Language": "zh-cn",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive"
-        }
-
-        login_url = f"{self._base_url}/customer/login"
-        _LOGGER.debug("Attempting login to %s with username: %s", login_url, self.username)
-        _LOGGER.debug("Login payload: %s", payload)
+    async def _get_device_status(self, per_mac=False):
+        """Get device status from API; return it with when (monotonic) it was requested."""
+        device = None
+        if self.bulk_polling and not per_mac:
+            device = await self._get_bulk_device_status()
+            fetched_at = self.client.devices_fetched_at
+        if device is None:
+            fetched_at = time.monotonic()
+            device = await self.transport.async_read(self.mac, hedge=self.hedging)
+        # 只记录必要的设备状态信息，避免日志过长
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Fetched device status for MAC %s: online=%s, temp=%s, light=%s, warm1=%s, warm2=%s, wind=%s, vent=%s",
+                          self.mac, device.get("online"), device.get("temperature"),
+                          device.get("lightSwitch"), device.get("warmingSwitch1"),
+                          device.get("warmingSwitch2"), device.get("windSwitch"),
+                          device.get("ventilationSwitch"))
+        return device, fetched_at
+
+    async def _get_bulk_device_status(self):
+        """Get this device from the account-wide device list, if it is there."""
+        # 略小于轮询周期，保证同一账号的协调器在一个周期内只触发一次请求
+        max_age = self.update_interval.total_seconds() * 0.9 if self.update_interval else 0
+        try:
+            devices = await self.transport.async_read_account(max_age)
+        except Exception as err:
+            _LOGGER.debug("Bulk device poll failed, falling back to per-MAC: %s", err)
+            return None
 
-        # Use the shared session
-        async with self._session.post(login_url, json=payload, headers=headers) as response:
-            _LOGGER.debug("Login response status: %d", response.status)
-            _LOGGER.debug("Login response headers: %s", dict(response.headers))
-            
-            try:
-                # 获取响应内容
-                response_text = await response.text()
-                _LOGGER.debug("Login response text (first 1000 chars): %s", response_text[:1000])
-                
-                if response.status == 200:
-                    # 手动解析JSON，因为API返回的Content-Type可能不正确
-                    data = json.loads(response_text)
-                    
-                    # 从响应中提取token
-                    self.token = data.get("token")
-                    if not self.token:
-                        _LOGGER.error("Login failed: No token received in response: %s", data)
-                        raise ConfigEntryAuthFailed("Login failed: No token received")
-                    
-                    _LOGGER.debug("Login successful for username: %s", self.username)
-                    _LOGGER.debug("Got token: %s", self.token[:20] + "...")
-                elif response.status == 401:
-                     _LOGGER.error("Login failed: Invalid credentials for username: %s", self.username)
-                     raise ConfigEntryAuthFailed("Invalid credentials")
-                else:
-                    _LOGGER.error("Login failed with status %d: %s", response.status, response_text)
-                    raise ConfigEntryAuthFailed(f"Login failed with status {response.status}: {response_text}")
-            except json.JSONDecodeError as ex:
-                _LOGGER.error("Failed to parse login response as JSON: %s", ex)
-                raise ConfigEntryAuthFailed(f"Login failed: Invalid response format: {ex}")
-            except Exception as ex:
-                _LOGGER.error("Exception during login: %s", ex)
-                raise ConfigEntryAuthFailed(f"Login failed: {str(ex)}")
-
-    async def _get_device_status(self):
-        """Get device status from API."""
-        if not self.token:
-            raise UpdateFailed("Cannot fetch status: Not logged in")
-
-        headers = {
-            "x-access-token": self.token,
-            "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-            "Accept": "*/*",
-            "Accept-Language": "zh-cn",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive"
-        }
-        
-        # 使用检测到的base_url或默认值
-        base_url = self._base_url if hasattr(self, '_base_url') and self._base_url else getattr(self, 'base_url', GET_DEVICE_URL.rsplit('/', 1)[0])
-        # 使用抓包数据中的正确端点，通过查询参数传递mac
-        url = f"{base_url}/device/getDeviceByMac?mac={self.mac}"
-
-        # Use the shared session
-        async with self._session.get(url, headers=headers) as response:
-            _LOGGER.debug("Device status response status: %d", response.status)
-            _LOGGER.debug("Device status response headers: %s", dict(response.headers))
-            
-            response_text = await response.text()
-            
-            if response.status == 200:
-                    # 手动解析JSON，因为API返回的Content-Type可能不正确
-                    device = json.loads(response_text)
-                    # 只记录必要的设备状态信息，避免日志过长
-                    _LOGGER.debug("Fetched device status for MAC %s: online=%s, temp=%s, light=%s, warm1=%s, warm2=%s, wind=%s, vent=%s", 
-                                 self.mac, device.get("online"), device.get("temperature"), 
-                                 device.get("lightSwitch"), device.get("warmingSwitch1"), 
-                                 device.get("warmingSwitch2"), device.get("windSwitch"), 
-                                 device.get("ventilationSwitch"))
-                    return device
-            elif response.status == 401:
-                # Token expired, re-login
-                _LOGGER.warning("Token expired while fetching device status, attempting re-login.")
-                self.token = None
-                await self._login()
-                return await self._get_device_status() # Retry after re-login
-            else:
-                _LOGGER.error("Failed to get device status for MAC %s, status %d: %s", self.mac, response.status, response_text)
-                raise UpdateFailed(f"Failed to get device status: Status {response.status}, Response: {response_text}")
+        device = devices.get(self.mac)
+        # 列表中缺少该设备或缺少状态字段时，退回按 MAC 查询
+        if not device or "lightSwitch" not in device:
+            _LOGGER.debug("Device %s missing from bulk payload, polling by MAC", self.mac)
+            return None
+        return device
 
     async def send_control_command(self, payload):
-        """Send control command to device."""
-        if not self.token:
-            await self._login()
-
-        headers = {
-            "x-access-token": self.token,
-            "Content-Type": "application/json; charset=utf-8",
-            "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-            "Accept": "*/*",
-            "Accept-Language": "zh-cn",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive"
+        """Send control command to device.
+
+        Commands go through the device's command queue and are written one
+        at a time; commands arriving within the coalescing window, or
+        queued behind a write in flight, are merged and sent once. Every
+        caller gets the result of the shared send.
+        """
+        if self.command_window <= 0:
+            return await self._async_enqueue_command(payload)
+
+        fold_command(self._pending_command, payload)
+        future = self.hass.loop.create_future()
+        self._pending_futures.append(future)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self.hass, self.command_window, self._async_flush_commands
+            )
+        return await future
+
+    async def _async_flush_commands(self, _now=None):
+        """Queue the merged pending command and resolve every waiting caller."""
+        self._unsub_flush = None
+        payload, self._pending_command = self._pending_command, {}
+        futures, self._pending_futures = self._pending_futures, []
+        try:
+            result = await self._async_enqueue_command(payload)
+        except Exception as err:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        for future in futures:
+            if not future.done():
+                future.set_result(result)
+
+    async def _async_enqueue_command(self, payload):
+        """Queue a command for the worker and wait for its result."""
+        future = self.hass.loop.create_future()
+        self._command_queue.put_nowait((payload, future))
+        if self._command_worker is None or self._command_worker.done():
+            self._command_worker = self.hass.async_create_background_task(
+                self._async_command_worker(), f"{self.name} command worker"
+            )
+        return await future
+
+    async def _async_command_worker(self):
+        """Send queued commands in order, one write at a time."""
+        while True:
+            payload, future = await self._command_queue.get()
+            payload = dict(payload)
+            futures = [future]
+            # 上一个请求在途期间排队的命令合并为一次写入
+            while not self._command_queue.empty():
+                queued_payload, queued_future = self._command_queue.get_nowait()
+                fold_command(payload, queued_payload)
+                futures.append(queued_future)
+            if len(futures) > 1:
+                _LOGGER.debug("Folded %d queued commands for %s into %s", len(futures), self.mac, payload)
+            try:
+                result = await self._async_send_merged(payload)
+            except asyncio.CancelledError:
+                for future in futures:
+                    future.cancel()
+                raise
+            except Exception as err:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(err)
+                continue
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
+
+    async def async_apply_state(self, changes):
+        """Bring the device to a mix of switch and parameter values in one pass.
+
+        Keys already at the requested value in the target state are
+        skipped; the rest go out as at most one switch write and one
+        parameter write. Returns the changes that were sent.
+        """
+        target = self.target_state
+        if target is not None:
+            changes = {key: value for key, value in changes.items() if getattr(target, key) != value}
+        if not changes:
+            _LOGGER.debug("Device %s already in the requested state", self.mac)
+            return changes
+        if not await self.send_control_command(changes):
+            raise HomeAssistantError(f"Device {self.name} rejected {changes}")
+        return changes
+
+    @property
+    def target_state(self) -> DeviceState | None:
+        """Return the state the device should reach once every accepted command is applied.
+
+        Polls can still return the state from before a write; commands are
+        built on top of this instead of the last poll.
+        """
+        if self.data is None or not self._confirm_expected:
+            return self.data
+        return self.data.replace(**self._confirm_expected)
+
+    async def _async_send_merged(self, payload):
+        """Send switch and parameter changes as separate control requests."""
+        switch_changes = {key: value for key, value in payload.items() if key not in PARAM_KEYS}
+        param_changes = {key: value for key, value in payload.items() if key in PARAM_KEYS}
+        result = True
+        if switch_changes:
+            result = await self._async_send_control(switch_changes)
+        if param_changes:
+            result = await self._async_send_control(param_changes) and result
+        return result
+
+    async def _async_send_control(self, payload):
+        """Send one switch or parameter control request."""
+        # Convert boolean values to device API format (1 = ON, 2 = OFF)
+        converted_payload = {
+            key: SWITCH_ENCODING[value] if isinstance(value, bool) else value
+            for key, value in payload.items()
         }
 
-        # Convert boolean values to device API format
-        # According to _process_device_data, device uses: 1 = ON, 2 = OFF
-        converted_payload = {}
-        for key, value in payload.items():
-            # Convert boolean to device API format
-            if isinstance(value, bool):
-                converted_payload[key] = 1 if value else 2  # 1=ON, 2=OFF
-            else:
-                converted_payload[key] = value
-
         # Determine if this is a parameter setting command
         # Parameter keys based on the HAR log
-        param_keys = ["ventilationAutoClose", "warmingAutoClose", "overHeatAutoClose", "lightAutoClose", "comovement", "motoVersion"]
-        is_param_command = any(key in converted_payload for key in param_keys)
+        is_param_command = any(key in converted_payload for key in PARAM_KEYS)
 
-        # Get current device data if available
-        current_data = self.data if hasattr(self, 'data') and self.data else {}
+        # Build on the running target state, not a poll that may predate earlier commands
+        current_data = self.target_state
         
         # Build control payload based on command type
         control_payload = {
@@ -386,8 +506,8 @@ class ZinguoDataUpdateCoordinator(DataUpdateCoordinator):
         if is_param_command:
             # For parameter commands, include necessary param fields from current data or defaults
             control_payload.update({
-                "comovement": current_data.get("comovement", 3),
-                "motoVersion": current_data.get("motoVersion", 2),
+                "comovement": current_data.comovement if current_data and current_data.comovement is not None else 3,
+                "motoVersion": current_data.motoVersion if current_data and current_data.motoVersion is not None else 2,
                 # Include the parameter being set
                 **converted_payload
             })
@@ -408,16 +528,9 @@ class ZinguoDataUpdateCoordinator(DataUpdateCoordinator):
             # Always use the latest cached data to maintain current state
             # This is crucial to prevent unexpected switch behavior
             if current_data:
-                # Convert boolean states to device API format (True -> 1, False -> 2)
+                # The state carries its switches pre-encoded (1 = ON, 2 = OFF)
                 # Important: Device expects 2 for OFF, not 0
-                current_status = {
-                    "warmingSwitch1": 1 if current_data.get("warmingSwitch1") else 2,
-                    "warmingSwitch2": 1 if current_data.get("warmingSwitch2") else 2,
-                    "windSwitch": 1 if current_data.get("windSwitch") else 2,
-                    "lightSwitch": 1 if current_data.get("lightSwitch") else 2,
-                    "ventilationSwitch": 1 if current_data.get("ventilationSwitch") else 2,
-                    "turnOffAll": 0
-                }
+                current_status = {**current_data.switch_payload(), "turnOffAll": 0}
             
             # Apply only the specific changes requested by the user
             # This ensures we don't modify any other switches unnecessarily
@@ -446,109 +559,143 @@ class ZinguoDataUpdateCoordinator(DataUpdateCoordinator):
 
         _LOGGER.debug("Sending control command: %s", control_payload)
 
-        # 使用检测到的base_url或默认值
-        base_url = self._base_url if hasattr(self, '_base_url') and self._base_url else getattr(self, 'base_url', CONTROL_URL.rsplit('/', 1)[0])
-        control_url = f"{base_url}/wifiyuba/yuBaControl"
-        
-        # Use the shared session
-        async with self._session.put(control_url, json=control_payload, headers=headers) as response:
-            _LOGGER.debug("Control command response status: %d", response.status)
-            _LOGGER.debug("Control command response headers: %s", dict(response.headers))
-            
-            response_text = await response.text()
-            _LOGGER.debug("Control command response text: %s", response_text)
-            
-            if response.status == 200:
-                _LOGGER.debug("Control command sent successfully.")
-                
-                # First, optimistically update the local state with the requested changes
-                # This provides immediate feedback to the user
-                optimistic_update = False
-                if self.data:
-                    updated_data = self.data.copy()
-                    for key, value in converted_payload.items():
-                        if key in updated_data:
-                            updated_data[key] = value == 1
-                            optimistic_update = True
-                    if optimistic_update:
-                        self.data = updated_data
-                        self.async_update_listeners()
-                
-                # Then, after a short delay, refresh from the actual device to ensure accuracy
-                # This handles the case where the device might take time to process the command
-                import asyncio
-                await asyncio.sleep(0.5)
-                
-                # Refresh data from device to get the actual state
-                actual_data = await self._async_update_data()
-                
-                # Only update and notify listeners if the actual state differs from our cached state
-                if actual_data != self.data:
-                    self.data = actual_data
-                    self.async_update_listeners()
-                
+        self._command_sent_at = time.monotonic()
+        accepted, response = await self.transport.async_control(control_payload)
+        if not accepted:
+            return False
+
+        _LOGGER.debug("Control command sent successfully.")
+
+        # The state the device should report once it has applied the command
+        if is_param_command:
+            expected = {key: value for key, value in converted_payload.items() if key in PARAM_KEYS}
+        elif "turnOffAll" in converted_payload:
+            expected = {key: False for key in SWITCH_KEYS}
+        else:
+            expected = {
+                key: control_payload[key] == 1
+                for key in SWITCH_KEYS
+                if key in converted_payload or (key == "windSwitch" and control_payload[key] == 1)
+            }
+
+        # 控制响应已包含设备新状态时，无需再确认
+        if self.data and response and all(key in response for key in expected):
+            reported = self._process_device_data(response)
+            if all(getattr(reported, key) == value for key, value in expected.items()):
+                _LOGGER.debug("Control response already confirms %s", expected)
+                self.async_set_updated_data(self.data.replace(**expected))
                 return True
-            elif response.status == 401:
-                # Token expired, re-login and retry once
-                _LOGGER.warning("Token expired while sending control command, attempting re-login and retry.")
-                self.token = None
-                await self._login()
-                # Recreate the payload with new token
-                new_headers = {
-                    "x-access-token": self.token,
-                    "Content-Type": "text/plain;charset=UTF-8",
-                    "User-Agent": "峥果智能/2 CFNetwork/3860.200.71 Darwin/25.1.0",
-                    "Accept": "*/*",
-                    "Accept-Language": "zh-cn",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive"
-                }
-                
-                # 使用更新后的base_url
-                base_url = self._base_url if hasattr(self, '_base_url') and self._base_url else getattr(self, 'base_url', CONTROL_URL.rsplit('/', 1)[0])
-                control_url = f"{base_url}/wifiyuba/yuBaControl"
-                
-                async with self._session.put(control_url, json=control_payload, headers=new_headers) as retry_resp:
-                    retry_text_response = await retry_resp.text()
-                    _LOGGER.debug("Control command retry response: %d, %s", retry_resp.status, retry_text_response)
-                    
-                    if retry_resp.status == 200:
-                        _LOGGER.debug("Control command sent successfully after re-login.")
-                        
-                        # First, optimistically update the local state with the requested changes
-                        optimistic_update = False
-                        if self.data:
-                            updated_data = self.data.copy()
-                            for key, value in converted_payload.items():
-                                if key in updated_data:
-                                    updated_data[key] = value == 1
-                                    optimistic_update = True
-                            if optimistic_update:
-                                self.data = updated_data
-                                self.async_update_listeners()
-                        
-                        # Then, after a short delay, refresh from the actual device to ensure accuracy
-                        import asyncio
-                        await asyncio.sleep(0.5)
-                        
-                        # Refresh data from device to get the actual state
-                        actual_data = await self._async_update_data()
-                        
-                        # Only update and notify listeners if the actual state differs from our cached state
-                        if actual_data != self.data:
-                            self.data = actual_data
-                            self.async_update_listeners()
-                        
-                        return True
-                    else:
-                        _LOGGER.error("Control command failed after re-login, status %d: %s", retry_resp.status, retry_text_response)
-                        return False
+
+        # Optimistically update the local state so the UI responds immediately
+        if self.data:
+            self.data = self.data.replace(**expected)
+            self._update_poll_tier(self.data)
+            self.async_update_listeners()
+
+        # Confirm in the background instead of holding the service call
+        self._confirm_expected.update(expected)
+        if self._confirm_task is None or self._confirm_task.done():
+            self._confirm_task = self.hass.async_create_background_task(
+                self._async_confirm_state(), f"{self.name} command confirmation"
+            )
+        return True
+
+    async def _async_confirm_state(self):
+        """Re-poll with backoff until the device reports the expected state."""
+        deadline = time.monotonic() + CONFIRM_DEADLINE
+        delay = CONFIRM_INITIAL_DELAY
+        actual_data = None
+        while self._confirm_expected:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CONFIRM_MAX_DELAY)
+            try:
+                # 绕过批量缓存，直接读取该设备的最新状态
+                actual_data = await self._async_update_data(per_mac=True)
+            except UpdateFailed as err:
+                _LOGGER.debug("Confirmation poll failed: %s", err)
+                actual_data = None
             else:
-                _LOGGER.error("Control command failed for MAC %s, status %d: %s", self.mac, response.status, response_text)
-                return False
+                # 移除已经确认的键，后续命令可能又追加了新的期望
+                for key, value in list(self._confirm_expected.items()):
+                    if getattr(actual_data, key) == value:
+                        del self._confirm_expected[key]
+            if time.monotonic() >= deadline:
+                if self._confirm_expected:
+                    _LOGGER.warning("Device %s did not confirm %s in time", self.mac, self._confirm_expected)
+                self._confirm_expected = {}
+                break
+
+        # Only update and notify listeners if the actual state differs from our cached state
+        if actual_data is not None and diff(self.data, actual_data):
+            self.async_set_updated_data(actual_data)
+
+    @callback
+    def async_start_transport(self):
+        """Subscribe to pushed updates when the transport supports them."""
+        if self._unsub_transport is None:
+            self._unsub_transport = self.transport.async_subscribe(self.mac, self._async_handle_push)
+
+    @callback
+    def _async_handle_push(self, raw_data):
+        """Apply a pushed device record, or resync when the stream connects or drops."""
+        if raw_data is None:
+            # 连接状态变化：调整兜底轮询间隔，并刷新一次补上可能错过的事件
+            if self.data is not None:
+                self._update_poll_tier(self.data)
+            self.client.async_invalidate_devices()
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+
+        state = self._process_device_data(raw_data)
+        if self.data is not None:
+            # 推送记录可能只含变化的字段，其余字段保持当前状态
+            state = self.data.merge_raw(raw_data)
+        for key, value in list(self._confirm_expected.items()):
+            if getattr(state, key) == value:
+                del self._confirm_expected[key]
+        self._update_poll_tier(state)
+        was_stale, self.stale = self.stale, False
+        if was_stale or diff(self.data, state):
+            self.async_set_updated_data(state)
 
     async def async_shutdown(self):
-        """Close the shared aiohttp session."""
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """Stop background work, flush the snapshot and close an owned client."""
+        if self._unsub_transport is not None:
+            self._unsub_transport()
+            self._unsub_transport = None
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        for future in self._pending_futures:
+            future.cancel()
+        self._pending_futures = []
+        if self._command_worker is not None:
+            self._command_worker.cancel()
+            self._command_worker = None
+        while not self._command_queue.empty():
+            _payload, future = self._command_queue.get_nowait()
+            future.cancel()
+        if self._confirm_task is not None:
+            self._confirm_task.cancel()
+        for unsub in self._unsub_countdown.values():
+            unsub()
+        self._unsub_countdown = {}
+        if self._snapshot_store is not None and self.data is not None:
+            # 立即写入并取消延迟保存，卸载或删除条目后计时器不会再写回文件
+            await self._snapshot_store.async_save(self._snapshot_data())
+        if self._owns_client:
+            await self.client.async_close()
         await super().async_shutdown()
+
+
+def fold_command(pending, payload):
+    """Fold a command into a pending one in place; later values win."""
+    if "turnOffAll" in payload:
+        # 全关覆盖之前排队的开关修改
+        for key in SWITCH_KEYS:
+            pending.pop(key, None)
+    elif "turnOffAll" in pending and any(key in payload for key in SWITCH_KEYS):
+        # 全关之后又有开关修改：展开为逐个关闭，再应用新的修改
+        del pending["turnOffAll"]
+        pending.update({key: False for key in SWITCH_KEYS})
+    pending.update(payload)
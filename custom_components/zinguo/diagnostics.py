@@ -0,0 +1,46 @@
+"""Diagnostics support for Zinguo."""
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN
+from .coordinator import ZinguoDataUpdateCoordinator
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, "token", "x-access-token", "masterUser", "account"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: ZinguoDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    client = coordinator.client
+
+    return async_redact_data(
+        {
+            "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+            "device": coordinator.data.as_dict() if coordinator.data else None,
+            "poll_tier": coordinator.poll_tier,
+            "api": {
+                "base_url": client.base_url,
+                "endpoint_rtts": client.endpoint_rtts,
+                "active_endpoint": client.active_endpoint,
+                "breakers": {endpoint: breaker.as_dict() for endpoint, breaker in client.breakers.items()},
+                "retry_budget": {
+                    "tokens": round(client.retry_budget.tokens, 2),
+                    "exhausted": client.retry_budget.exhausted,
+                },
+                "rate_limiters": {
+                    endpoint: {kind: bucket.as_dict() for kind, bucket in buckets.items()}
+                    for endpoint, buckets in client.rate_limiters.items()
+                },
+                "token_issued_at": client.token_issued_at,
+                "stats": client.stats.as_dict(),
+            },
+            # 最近请求的分阶段耗时（DNS、连接含 TLS、首字节、传输、客户端总耗时）
+            "requests": list(client.tracer.records),
+        },
+        TO_REDACT,
+    )
@@ -0,0 +1,29 @@
+"""Base entity for the Zinguo integration."""
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import ZinguoDataUpdateCoordinator
+
+
+class ZinguoEntity(CoordinatorEntity[ZinguoDataUpdateCoordinator]):
+    """Base class for entities backed by a Zinguo device coordinator."""
+
+    def _set_device_entity(self, key, name):
+        """Name the entity after its device and attach it to the device registry entry."""
+        coordinator = self.coordinator
+        # 使用设备ID作为唯一标识符，与风扇和开关实体保持一致
+        device_id = coordinator.device_id or coordinator.mac
+        # 限制设备名称长度，避免实体名称过长
+        device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
+        self._attr_name = f"{device_name} {name}"
+        self._attr_unique_id = f"{device_id}_{key}"
+        self._attr_device_info = coordinator.device_info
+
+    @property
+    def available(self) -> bool:
+        """Return False until the device state is known."""
+        return super().available and self.coordinator.data is not None
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return True while showing the state restored from disk."""
+        return self.coordinator.stale
@@ -6,7 +6,6 @@ from homeassistant.components.fan import FanEntity, FanEntityFeature
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util.percentage import (
     ordered_list_item_to_percentage,
     percentage_to_ordered_list_item,
@@ -14,11 +13,15 @@ from homeassistant.util.percentage import (
 
 from .const import DOMAIN
 from .coordinator import ZinguoDataUpdateCoordinator # Import coordinator type
+from .entity import ZinguoEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 PRESET_MODES = ["关闭", "暖风 1", "暖风 2", "吹风"]
 
+# 预设模式由这三个开关决定
+FAN_KEYS = ["warmingSwitch1", "warmingSwitch2", "windSwitch"]
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -28,41 +31,31 @@ async def async_setup_entry(
     # 从 hass.data 中获取协调器实例
     coordinator: ZinguoDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
-    # 从协调器的 data 中获取设备信息
-    device_info = coordinator.data # Assuming single device per entry
-
     # 创建风扇实体，传入协调器对象
-    entity = ZinguoFan(coordinator, device_info)
+    entity = ZinguoFan(coordinator)
     async_add_entities([entity])
 
 
-class ZinguoFan(CoordinatorEntity, FanEntity):
+class ZinguoFan(ZinguoEntity, FanEntity):
     """Representation of a Zinguo fan."""
 
-    def __init__(self, coordinator: ZinguoDataUpdateCoordinator, device_info: dict[str, Any]):
+    def __init__(self, coordinator: ZinguoDataUpdateCoordinator):
         """Initialize the fan."""
-        super().__init__(coordinator)
-        self._device_info = device_info
-        self._attr_unique_id = f"{device_info['id']}_fan" # Construct unique_id
+        super().__init__(coordinator, frozenset(FAN_KEYS))
+        self._attr_unique_id = f"{coordinator.device_id}_fan" # Construct unique_id
         # 限制设备名称长度，避免实体名称过长
         device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
         self._attr_name = f"{device_name} 浴霸"
         self._attr_preset_modes = PRESET_MODES
         # 添加对预设模式、开关功能的支持
         self._attr_supported_features = FanEntityFeature.PRESET_MODE | FanEntityFeature.TURN_ON | FanEntityFeature.TURN_OFF
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device_info["id"])},
-            "name": device_name, # Use coordinator's determined name
-            "manufacturer": "Zinguo",
-            "model": device_info.get("deviceModel", "智能浴霸"),
-            "sw_version": device_info.get("firmwareVersion", "Unknown Version"),
-        }
+        self._attr_device_info = coordinator.device_info
         # Initialize state from coordinator's data if available
         if coordinator.data:
             device_status = coordinator.data
-            warming1_on = device_status.get('warmingSwitch1', False)
-            warming2_on = device_status.get('warmingSwitch2', False)
-            wind_on = device_status.get('windSwitch', False)
+            warming1_on = device_status.warmingSwitch1
+            warming2_on = device_status.warmingSwitch2
+            wind_on = device_status.windSwitch
             
             # Check if any of the switches is on
             any_on = warming1_on or warming2_on or wind_on
@@ -98,11 +91,15 @@ class ZinguoFan(CoordinatorEntity, FanEntity):
         """Handle updated data from the coordinator."""
         # 根据协调器的最新数据更新风扇状态
         device_status = self.coordinator.data # Get fresh data
+        if device_status is None:
+            # 首次刷新失败时还没有数据，只更新可用性
+            self.async_write_ha_state()
+            return
 
         # Determine current preset mode based on device status
-        warming1_on = device_status.get('warmingSwitch1', False)
-        warming2_on = device_status.get('warmingSwitch2', False)
-        wind_on = device_status.get('windSwitch', False)
+        warming1_on = device_status.warmingSwitch1
+        warming2_on = device_status.warmingSwitch2
+        wind_on = device_status.windSwitch
 
         # Check if any of the switches is on
         any_on = warming1_on or warming2_on or wind_on
@@ -0,0 +1,93 @@
+"""In-memory temperature history for the Zinguo integration."""
+from array import array
+
+from .const import TEMPERATURE_HISTORY_SIZE
+
+
+class TemperatureHistory:
+    """Fixed-size ring buffer of (monotonic time, °C) samples.
+
+    Two flat ``array('d')`` buffers hold the samples; memory does not grow
+    with uptime, and nothing here reaches the recorder.
+    """
+
+    __slots__ = ("_times", "_values", "_next", "_count", "samples")
+
+    def __init__(self, size=TEMPERATURE_HISTORY_SIZE):
+        """Initialize."""
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._next = 0
+        self._count = 0
+        # 累计样本数，监听器据此判断是否有新样本
+        self.samples = 0
+
+    def add(self, timestamp, value):
+        """Record a sample, overwriting the oldest once full.
+
+        Samples not newer than the latest one are ignored: a cached record
+        read again, or a read that finished after a newer one.
+        """
+        if self._count and timestamp <= self._times[(self._next - 1) % len(self._times)]:
+            return
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._times)
+        self._count = min(self._count + 1, len(self._times))
+        self.samples += 1
+
+    def window(self, seconds, now):
+        """Yield (time, value) of the samples from the last ``seconds``, oldest first."""
+        size = len(self._times)
+        start = now - seconds
+        # 从最新样本向前找到窗口起点，再按时间顺序输出
+        first = self._count
+        for offset in range(1, self._count + 1):
+            if self._times[(self._next - offset) % size] < start:
+                first = offset - 1
+                break
+        for offset in range(first, 0, -1):
+            index = (self._next - offset) % size
+            yield self._times[index], self._values[index]
+
+    def stats(self, seconds, now):
+        """Return (min, max, mean) over the window, or None without samples."""
+        values = [value for _, value in self.window(seconds, now)]
+        if not values:
+            return None
+        return min(values), max(values), sum(values) / len(values)
+
+    def rate(self, seconds, now):
+        """Return the least-squares slope over the window in °C per minute, or None."""
+        samples = list(self.window(seconds, now))
+        if len(samples) < 2:
+            return None
+        count = len(samples)
+        mean_t = sum(t for t, _ in samples) / count
+        mean_v = sum(v for _, v in samples) / count
+        variance = sum((t - mean_t) ** 2 for t, _ in samples)
+        if not variance:
+            return None
+        covariance = sum((t - mean_t) * (v - mean_v) for t, v in samples)
+        return covariance / variance * 60
+
+    @property
+    def latest(self):
+        """Return the newest value, or None."""
+        if not self._count:
+            return None
+        return self._values[(self._next - 1) % len(self._times)]
+
+
+def minutes_to_threshold(current, rate, threshold):
+    """Return minutes until ``current`` rising at ``rate`` °C/min reaches ``threshold``.
+
+    Returns 0 once reached and None while not heating.
+    """
+    if current is None or threshold is None:
+        return None
+    if current >= threshold:
+        return 0.0
+    if not rate or rate <= 0:
+        return None
+    return (threshold - current) / rate
@@ -1,15 +1,15 @@
 """Number platform for Zinguo."""
 import logging
-from typing import Any, Optional
+from typing import Optional
 
 from homeassistant.components.number import NumberEntity, NumberDeviceClass, NumberMode
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import DOMAIN
 from .coordinator import ZinguoDataUpdateCoordinator
+from .entity import ZinguoEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,24 +21,22 @@ async def async_setup_entry(
 ) -> None:
     """Set up Zinguo number entities based on a config entry."""
     coordinator: ZinguoDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
-    device_info = coordinator.data
 
     entities = [
-        ZinguoVentilationAutoCloseNumber(coordinator, device_info),
-        ZinguoWarmingAutoCloseNumber(coordinator, device_info),
-        ZinguoOverHeatAutoCloseNumber(coordinator, device_info),
+        ZinguoVentilationAutoCloseNumber(coordinator),
+        ZinguoWarmingAutoCloseNumber(coordinator),
+        ZinguoOverHeatAutoCloseNumber(coordinator),
     ]
 
-    async_add_entities(entities, True)
+    async_add_entities(entities)
 
 
-class ZinguoNumberBase(CoordinatorEntity, NumberEntity):
+class ZinguoNumberBase(ZinguoEntity, NumberEntity):
     """Base class for Zinguo number entities."""
 
     def __init__(
         self,
         coordinator: ZinguoDataUpdateCoordinator,
-        device_info: dict[str, Any],
         key: str,
         name_suffix: str,
         min_value: float,
@@ -48,19 +46,12 @@ class ZinguoNumberBase(CoordinatorEntity, NumberEntity):
         unit_of_measurement: Optional[str] = None,
     ):
         """Initialize the number entity."""
-        super().__init__(coordinator)
-        self._device_info = device_info
+        super().__init__(coordinator, frozenset({key}))
         self._key = key
         device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
         self._attr_name = f"{device_name} {name_suffix}"
-        self._attr_unique_id = f"{device_info['id']}_{key}"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device_info["id"])},
-            "name": device_name,
-            "manufacturer": "Zinguo",
-            "model": device_info.get("deviceModel", "智能浴霸"),
-            "sw_version": device_info.get("firmwareVersion", "Unknown Version"),
-        }
+        self._attr_unique_id = f"{coordinator.device_id}_{key}"
+        self._attr_device_info = coordinator.device_info
         self._attr_native_min_value = min_value
         self._attr_native_max_value = max_value
         self._attr_native_step = step
@@ -71,12 +62,13 @@ class ZinguoNumberBase(CoordinatorEntity, NumberEntity):
         
         # Initialize state from coordinator's data if available
         if coordinator.data:
-            self._attr_native_value = coordinator.data.get(key)
+            self._attr_native_value = getattr(coordinator.data, key)
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self._attr_native_value = self.coordinator.data.get(self._key)
+        if self.coordinator.data is not None:
+            self._attr_native_value = getattr(self.coordinator.data, self._key)
         self.async_write_ha_state()
 
     async def async_set_native_value(self, value: float) -> None:
@@ -88,11 +80,10 @@ class ZinguoNumberBase(CoordinatorEntity, NumberEntity):
 class ZinguoVentilationAutoCloseNumber(ZinguoNumberBase):
     """Representation of a Zinguo ventilation auto close number entity."""
 
-    def __init__(self, coordinator: ZinguoDataUpdateCoordinator, device_info: dict[str, Any]):
+    def __init__(self, coordinator: ZinguoDataUpdateCoordinator):
         """Initialize the ventilation auto close number entity."""
         super().__init__(
             coordinator=coordinator,
-            device_info=device_info,
             key="ventilationAutoClose",
             name_suffix="换气自动关闭倒计时",
             min_value=0.0,
@@ -105,11 +96,10 @@ class ZinguoVentilationAutoCloseNumber(ZinguoNumberBase):
 class ZinguoWarmingAutoCloseNumber(ZinguoNumberBase):
     """Representation of a Zinguo warming auto close number entity."""
 
-    def __init__(self, coordinator: ZinguoDataUpdateCoordinator, device_info: dict[str, Any]):
+    def __init__(self, coordinator: ZinguoDataUpdateCoordinator):
         """Initialize the warming auto close number entity."""
         super().__init__(
             coordinator=coordinator,
-            device_info=device_info,
             key="warmingAutoClose",
             name_suffix="取暖自动关闭倒计时",
             min_value=0.0,
@@ -122,11 +112,10 @@ class ZinguoWarmingAutoCloseNumber(ZinguoNumberBase):
 class ZinguoOverHeatAutoCloseNumber(ZinguoNumberBase):
     """Representation of a Zinguo overheat auto close number entity."""
 
-    def __init__(self, coordinator: ZinguoDataUpdateCoordinator, device_info: dict[str, Any]):
+    def __init__(self, coordinator: ZinguoDataUpdateCoordinator):
         """Initialize the overheat auto close number entity."""
         super().__init__(
             coordinator=coordinator,
-            device_info=device_info,
             key="overHeatAutoClose",
             name_suffix="过热自动关闭温度",
             min_value=35.0,
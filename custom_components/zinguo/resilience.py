@@ -0,0 +1,199 @@
+"""Circuit breaker, retry budget and rate limiter for the Zinguo API client."""
+import asyncio
+import random
+import time
+from collections import deque
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_RESET_TIMEOUT,
+    BREAKER_RESET_TIMEOUT,
+    RATE_LIMIT_WAIT_WINDOW,
+    RETRY_BASE_DELAY,
+    RETRY_BUDGET_MAX_TOKENS,
+    RETRY_BUDGET_RATIO,
+    RETRY_MAX_DELAY,
+)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: closed -> open after repeated failures -> half-open trial."""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, max_reset_timeout=BREAKER_MAX_RESET_TIMEOUT):
+        """Initialize."""
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        """Return the current state; an open breaker turns half-open after its timeout."""
+        if self._opened_at is None:
+            return STATE_CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    def allow_request(self):
+        """Return whether a request may go to this endpoint now."""
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN and not self._trial_in_flight:
+            # 半开状态只放行一个试探请求
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        """Close the breaker."""
+        self.failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        """Count a failure; open the breaker at the threshold or after a failed trial."""
+        self.failures += 1
+        if self._trial_in_flight:
+            # 试探失败，延长下次打开时间
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial that ended without an outcome (cancelled)."""
+        self._trial_in_flight = False
+
+    def as_dict(self):
+        """Return a snapshot for diagnostics."""
+        return {"state": self.state, "failures": self.failures, "reset_timeout": self.reset_timeout}
+
+
+class RetryBudget:
+    """Cap retries to a fraction of requests so an outage cannot multiply load.
+
+    Every request earns ``ratio`` of a retry token, up to ``max_tokens``;
+    each retry spends one.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, max_tokens=RETRY_BUDGET_MAX_TOKENS):
+        """Initialize."""
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+        self.exhausted = 0
+
+    def record_request(self):
+        """Earn retry credit for a first attempt."""
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self):
+        """Spend one retry token if available."""
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``capacity``.
+
+    Callers over budget wait in line (FIFO) for the next token instead of
+    failing, up to their own deadline.
+    """
+
+    def __init__(self, rate, capacity):
+        """Initialize."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        # 排队中的请求数，以及排过队的请求的等待时间
+        self.queue_depth = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        # 最近 RATE_LIMIT_WAIT_WINDOW 秒内排过队的 (时间, 等待秒数)
+        self._recent_waits = deque()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, timeout):
+        """Take a token, waiting up to ``timeout`` seconds; return whether one was taken."""
+        self._refill()
+        if self.tokens >= 1 and not self.queue_depth:
+            self.tokens -= 1
+            return True
+
+        start = time.monotonic()
+        deadline = start + timeout
+        self.queue_depth += 1
+        try:
+            async with asyncio.timeout(timeout):
+                async with self._lock:
+                    self._refill()
+                    while self.tokens < 1:
+                        wait = (1 - self.tokens) / self.rate
+                        if time.monotonic() + wait > deadline:
+                            # 截止前等不到令牌，不必空等
+                            raise TimeoutError
+                        await asyncio.sleep(wait)
+                        self._refill()
+                    self.tokens -= 1
+        except TimeoutError:
+            self.timeouts += 1
+            return False
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.queued += 1
+        self.total_wait += waited
+        self.last_wait = waited
+        self.max_wait = max(self.max_wait, waited)
+        self._recent_waits.append((time.monotonic(), waited))
+        return True
+
+    def recent_max_wait(self):
+        """Return the longest wait (seconds) in the last RATE_LIMIT_WAIT_WINDOW seconds."""
+        cutoff = time.monotonic() - RATE_LIMIT_WAIT_WINDOW
+        while self._recent_waits and self._recent_waits[0][0] < cutoff:
+            self._recent_waits.popleft()
+        return max((waited for _, waited in self._recent_waits), default=0.0)
+
+    def as_dict(self):
+        """Return a snapshot for diagnostics."""
+        self._refill()
+        return {
+            "tokens": round(self.tokens, 2),
+            "queue_depth": self.queue_depth,
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "mean_wait": round(self.total_wait / self.queued, 3) if self.queued else None,
+            "max_wait": round(self.max_wait, 3),
+            "recent_max_wait": round(self.recent_max_wait(), 3),
+        }
+
+
+def backoff_delay(attempt):
+    """Return a jittered exponential delay (seconds) before retry ``attempt``."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -9,6 +9,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
 from .coordinator import ZinguoDataUpdateCoordinator
+from .entity import ZinguoEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,11 +22,12 @@ async def async_setup_entry(
     coordinator: ZinguoDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     async_add_entities([ZinguoLightAutoCloseSelect(coordinator)])
 
-class ZinguoLightAutoCloseSelect(SelectEntity):
+class ZinguoLightAutoCloseSelect(ZinguoEntity, SelectEntity):
     """Representation of a Zinguo light auto close select entity."""
 
     def __init__(self, coordinator: ZinguoDataUpdateCoordinator) -> None:
         """Initialize the select entity."""
+        super().__init__(coordinator, frozenset({"lightAutoClose"}))
         self._coordinator = coordinator
         self._attr_name = f"{coordinator.name} Light Auto Close"
         self._attr_unique_id = f"{coordinator.mac}_light_auto_close"
@@ -42,7 +44,9 @@ class ZinguoLightAutoCloseSelect(SelectEntity):
     def current_option(self) -> str | None:
         """Return the current selected option."""
         # Get lightAutoClose value from coordinator data
-        light_auto_close = self._coordinator.data.get("lightAutoClose")
+        if self._coordinator.data is None:
+            return None
+        light_auto_close = self._coordinator.data.lightAutoClose
         if light_auto_close is None:
             return "00:00"
         
@@ -66,7 +70,7 @@ class ZinguoLightAutoCloseSelect(SelectEntity):
         hours, minutes = map(int, option.split(":"))
         
         # Get current lightAutoClose settings to preserve status
-        current_light_auto_close = self._coordinator.data.get("lightAutoClose", {})
+        current_light_auto_close = self._coordinator.data.lightAutoClose if self._coordinator.data else {}
         
         # Determine current status
         if isinstance(current_light_auto_close, dict):
@@ -82,16 +86,3 @@ class ZinguoLightAutoCloseSelect(SelectEntity):
                 "status": status
             }
         })
-
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return self._coordinator.last_update_success
-
-    async def async_added_to_hass(self) -> None:
-        """When entity is added to hass."""
-        self.async_on_remove(self._coordinator.async_add_listener(self.async_write_ha_state))
-
-    async def async_update(self) -> None:
-        """Update the entity."""
-        await self._coordinator.async_request_refresh()
@@ -1,11 +1,35 @@
 """Platform for sensor integration."""
-from homeassistant.components.sensor import SensorEntity
+import time
+from datetime import timedelta
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import (
+    ACTIVITY_KEYS,
+    COUNTDOWN_CHANNELS,
+    DOMAIN,
+    POLL_TIER_KEY,
+    RATE_LIMIT_READ,
+    RATE_LIMIT_WRITE,
+    SIGNAL_PRIMARY_ENTRY_CHANGED,
+    TEMPERATURE_HISTORY_KEY,
+)
 from .coordinator import ZinguoDataUpdateCoordinator
+from .entity import ZinguoEntity
+from .history import minutes_to_threshold
+from .stats import endpoint_host
+
+# 需要统计延迟分位数的接口
+LATENCY_OPERATIONS = ["getDeviceByMac", "yuBaControl", "login"]
+HEDGED_OPERATIONS = ["getDeviceByMac"]
 
 
 async def async_setup_entry(
@@ -19,30 +43,36 @@ async def async_setup_entry(
     sensors = [
         TemperatureSensor(coordinator),
         OnlineStatusSensor(coordinator),
+        *_temperature_history_sensors(coordinator),
+        AutoCloseCountdownSensor(coordinator, "warming", "暖风剩余时间"),
+        AutoCloseCountdownSensor(coordinator, "ventilation", "换气剩余时间"),
     ]
 
-    async_add_entities(sensors, True)
+    # 账号级诊断实体只由该账号的主条目创建
+    if coordinator.client.primary_entry_id == entry.entry_id:
+        sensors.extend(_account_diagnostic_sensors(coordinator))
+
+    async_add_entities(sensors)
+
+    @callback
+    def async_primary_entry_changed():
+        """Take over the account entities after the primary entry unloads."""
+        if coordinator.client.primary_entry_id == entry.entry_id:
+            async_add_entities(_account_diagnostic_sensors(coordinator))
+
+    entry.async_on_unload(async_dispatcher_connect(
+        hass, SIGNAL_PRIMARY_ENTRY_CHANGED.format(coordinator.client.username), async_primary_entry_changed
+    ))
 
 
-class TemperatureSensor(SensorEntity):
+class TemperatureSensor(ZinguoEntity, SensorEntity):
     """Representation of a Zinguo temperature sensor."""
 
     def __init__(self, coordinator):
         """Initialize the sensor."""
+        super().__init__(coordinator, frozenset({"temperature"}))
         self._coordinator = coordinator
-        # 使用设备ID作为唯一标识符，与风扇和开关实体保持一致
-        device_id = coordinator.data.get("id") if coordinator.data else coordinator.mac
-        # 限制设备名称长度，避免实体名称过长
-        device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
-        self._attr_name = f"{device_name} 温度"
-        self._attr_unique_id = f"{device_id}_temperature"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device_id)},
-            "name": device_name,
-            "manufacturer": "Zinguo",
-            "model": coordinator.data.get("deviceModel", "Smart Bathroom Fan") if coordinator.data else "Smart Bathroom Fan",
-            "sw_version": coordinator.data.get("firmwareVersion") if coordinator.data else None,
-        }
+        self._set_device_entity("temperature", "温度")
         self._attr_native_unit_of_measurement = "°C"
         self._attr_device_class = "temperature"
 
@@ -50,7 +80,7 @@ class TemperatureSensor(SensorEntity):
     def native_value(self):
         """Return the temperature value."""
         if self._coordinator.data:
-            temp = self._coordinator.data.get("temperature")
+            temp = self._coordinator.data.temperature
             if temp is not None:
                 try:
                     return float(temp)
@@ -58,64 +88,259 @@ class TemperatureSensor(SensorEntity):
                     return None
         return None
 
-    @property
-    def available(self):
-        """Return if entity is available."""
-        # 传感器可用性不应仅依赖于数据是否存在，而应考虑设备是否在线
-        return self._coordinator.last_update_success
-
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self.async_on_remove(
-            self._coordinator.async_add_listener(self.async_write_ha_state)
+
+def _temperature_history_sensors(coordinator):
+    """Build the sensors derived from the in-memory temperature history."""
+    history = coordinator.temperature_history
+
+    def window():
+        return coordinator.temperature_window * 60
+
+    def window_stat(index):
+        stats = history.stats(window(), time.monotonic())
+        return round(stats[index], 1) if stats else None
+
+    def heating_rate():
+        rate = history.rate(window(), time.monotonic())
+        return round(rate, 2) if rate is not None else None
+
+    def minutes_to_overheat():
+        data = coordinator.data
+        minutes = minutes_to_threshold(
+            history.latest,
+            history.rate(window(), time.monotonic()),
+            data.overHeatAutoClose if data else None,
         )
+        return round(minutes, 1) if minutes is not None else None
 
-    async def async_update(self):
-        """Update the entity."""
-        await self._coordinator.async_request_refresh()
+    sensors = [
+        TemperatureHistorySensor(
+            coordinator, "heating_rate", "升温速率", heating_rate, unit="°C/min",
+        ),
+        TemperatureHistorySensor(
+            coordinator, "minutes_to_overheat", "距过热关闭", minutes_to_overheat,
+            unit=UnitOfTime.MINUTES, device_class=SensorDeviceClass.DURATION,
+            extra_context={"overHeatAutoClose"},
+        ),
+    ]
+    for index, (key, label) in enumerate((("min", "最低"), ("max", "最高"), ("mean", "平均"))):
+        sensors.append(TemperatureHistorySensor(
+            coordinator, f"temperature_{key}", f"窗口{label}温度", lambda index=index: window_stat(index),
+            unit="°C", device_class=SensorDeviceClass.TEMPERATURE,
+        ))
+    return sensors
 
 
-class OnlineStatusSensor(SensorEntity):
+class TemperatureHistorySensor(ZinguoEntity, SensorEntity):
+    """Value derived from the coordinator's in-memory temperature history.
+
+    Only the derived value is recorded; the samples themselves are never
+    exposed as attributes.
+    """
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, key, name, value_fn, unit=None, device_class=None, extra_context=()):
+        """Initialize the sensor."""
+        # 每个新温度样本都会改变派生值，即使温度本身没有变化
+        super().__init__(coordinator, frozenset({TEMPERATURE_HISTORY_KEY, *extra_context}))
+        self._coordinator = coordinator
+        self._value_fn = value_fn
+        self._set_device_entity(key, name)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+
+    @property
+    def native_value(self):
+        """Return the derived value."""
+        return self._value_fn()
+
+
+class AutoCloseCountdownSensor(ZinguoEntity, SensorEntity):
+    """Seconds left before a channel auto-closes, computed locally.
+
+    Ticks every second while the countdown runs without any API call.
+    """
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+
+    def __init__(self, coordinator, channel, name):
+        """Initialize the sensor."""
+        switch_keys, param = COUNTDOWN_CHANNELS[channel]
+        super().__init__(coordinator, frozenset({*switch_keys, param}))
+        self._coordinator = coordinator
+        self._channel = channel
+        self._unsub_tick = None
+        self._set_device_entity(f"{channel}_remaining", name)
+
+    @property
+    def native_value(self):
+        """Return the remaining seconds, or None when not counting down."""
+        remaining = self._coordinator.countdown_remaining(self._channel)
+        return round(remaining) if remaining is not None else None
+
+    async def async_added_to_hass(self) -> None:
+        """Start ticking if a countdown is already running."""
+        await super().async_added_to_hass()
+        self._update_ticker()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop ticking."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Follow the channel turning on or off."""
+        self._update_ticker()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _update_ticker(self):
+        # 只在倒计时进行时每秒刷新
+        running = bool(self._coordinator.countdown_remaining(self._channel))
+        if running and self._unsub_tick is None:
+            self._unsub_tick = async_track_time_interval(self.hass, self._async_tick, timedelta(seconds=1))
+        elif not running and self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+
+    @callback
+    def _async_tick(self, _now) -> None:
+        self._update_ticker()
+        self.async_write_ha_state()
+
+
+class OnlineStatusSensor(ZinguoEntity, SensorEntity):
     """Representation of a Zinguo online status sensor."""
 
     def __init__(self, coordinator):
         """Initialize the sensor."""
+        # 轮询档位属性随活动开关和档位变化
+        super().__init__(coordinator, frozenset({"online", POLL_TIER_KEY, *ACTIVITY_KEYS}))
         self._coordinator = coordinator
-        # 使用设备ID作为唯一标识符，与风扇和开关实体保持一致
-        device_id = coordinator.data.get("id") if coordinator.data else coordinator.mac
-        # 限制设备名称长度，避免实体名称过长
-        device_name = coordinator.name[:32] if coordinator.name else "Zinguo"
-        self._attr_name = f"{device_name} 在线状态"
-        self._attr_unique_id = f"{device_id}_online"
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device_id)},
-            "name": device_name,
-            "manufacturer": "Zinguo",
-            "model": coordinator.data.get("deviceModel", "智能浴霸") if coordinator.data else "智能浴霸",
-            "sw_version": coordinator.data.get("firmwareVersion") if coordinator.data else None,
-        }
+        self._set_device_entity("online", "在线状态")
         self._attr_device_class = None
 
     @property
     def native_value(self):
         """Return the online status."""
         if self._coordinator.data:
-            online = self._coordinator.data.get("online")
+            online = self._coordinator.data.online
             return "在线" if online == 1 else "离线"
         return "Unknown"
 
     @property
-    def available(self):
-        """Return if entity is available."""
-        # 传感器可用性不应仅依赖于数据是否存在，而应考虑设备是否在线
-        return self._coordinator.last_update_success
-
-    async def async_added_to_hass(self):
-        """When entity is added to hass."""
-        self.async_on_remove(
-            self._coordinator.async_add_listener(self.async_write_ha_state)
-        )
+    def extra_state_attributes(self):
+        """Return the current adaptive polling tier."""
+        interval = self._coordinator.update_interval
+        return {
+            "poll_tier": self._coordinator.poll_tier,
+            "poll_interval": interval.total_seconds() if interval else None,
+            # 仍在显示启动时恢复的快照，尚未收到云端数据
+            "stale": self._coordinator.stale,
+        }
+
 
-    async def async_update(self):
-        """Update the entity."""
-        await self._coordinator.async_request_refresh()
+def _account_diagnostic_sensors(coordinator):
+    """Build the API performance and health sensors for an account."""
+    stats = coordinator.client.stats
+    sensors = []
+    for endpoint in coordinator.client.endpoints:
+        host = endpoint_host(endpoint)
+        sensors.append(ApiDiagnosticSensor(
+            coordinator, f"requests_{host}", f"{host} 请求数",
+            lambda host=host: stats.requests.get(host, 0),
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        ))
+        sensors.append(ApiDiagnosticSensor(
+            coordinator, f"errors_{host}", f"{host} 错误数",
+            lambda host=host: stats.errors.get(host, 0),
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        ))
+    for operation in LATENCY_OPERATIONS:
+        for label, quantile in (("P50", 0.5), ("P95", 0.95)):
+            sensors.append(ApiDiagnosticSensor(
+                coordinator, f"{operation}_{label.lower()}", f"{operation} {label} 延迟",
+                lambda operation=operation, quantile=quantile: _round(stats.percentile(operation, quantile)),
+                unit=UnitOfTime.MILLISECONDS,
+                device_class=SensorDeviceClass.DURATION,
+                state_class=SensorStateClass.MEASUREMENT,
+            ))
+    for operation in HEDGED_OPERATIONS:
+        sensors.append(ApiDiagnosticSensor(
+            coordinator, f"{operation}_hedges", f"{operation} 对冲次数",
+            lambda operation=operation: stats.hedges.get(operation, 0),
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        ))
+        sensors.append(ApiDiagnosticSensor(
+            coordinator, f"{operation}_hedge_wins", f"{operation} 对冲胜出次数",
+            lambda operation=operation: stats.hedge_wins.get(operation, 0),
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        ))
+    sensors.append(ApiDiagnosticSensor(
+        coordinator, "rate_limit_queue_depth", "限流排队请求数",
+        lambda: coordinator.client.rate_limit_queue_depth,
+        state_class=SensorStateClass.MEASUREMENT,
+    ))
+    for kind, label in ((RATE_LIMIT_READ, "读取"), (RATE_LIMIT_WRITE, "控制")):
+        sensors.append(ApiDiagnosticSensor(
+            coordinator, f"rate_limit_{kind}_recent_wait", f"{label}限流近期最长等待",
+            lambda kind=kind: _round(coordinator.client.rate_limit_recent_wait(kind) * 1000),
+            unit=UnitOfTime.MILLISECONDS,
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.MEASUREMENT,
+        ))
+    sensors.append(ApiDiagnosticSensor(
+        coordinator, "relogins", "401 重新登录次数",
+        lambda: stats.relogins,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+    ))
+    sensors.append(ApiDiagnosticSensor(
+        coordinator, "last_success", "上次成功刷新",
+        lambda: stats.last_success,
+        device_class=SensorDeviceClass.TIMESTAMP,
+    ))
+    return sensors
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+class ApiDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Account-level Zinguo cloud API statistic."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, key, name, value_fn, unit=None, device_class=None, state_class=None):
+        """Initialize the sensor."""
+        # 统计数据随每次请求变化，监听所有更新
+        super().__init__(coordinator)
+        self._value_fn = value_fn
+        username = coordinator.client.username
+        self._attr_name = f"Zinguo API {name}"
+        self._attr_unique_id = f"account_{username}_{key}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, f"account_{username}")},
+            "name": f"Zinguo 账号 {username}",
+            "manufacturer": "Zinguo",
+            "model": "Cloud API",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    @property
+    def native_value(self):
+        """Return the statistic."""
+        return self._value_fn()
+
+    @property
+    def available(self):
+        """Statistics stay readable while the cloud is failing."""
+        return True
@@ -0,0 +1,242 @@
+"""Services for the Zinguo integration."""
+import asyncio
+import logging
+import time
+
+import voluptuous as vol
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import (
+    APPLY_STATE_PARAM_KEYS,
+    DEFAULT_FLEET_CONCURRENCY,
+    DOMAIN,
+    MAX_FLEET_CONCURRENCY,
+    SERVICE_APPLY_STATE,
+    SERVICE_RESTORE,
+    SERVICE_RUN_COMMAND,
+    SERVICE_SNAPSHOT,
+    SWITCH_KEYS,
+)
+from .coordinator import ZinguoDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_MAX_CONCURRENCY = "max_concurrency"
+ATTR_SNAPSHOT = "snapshot"
+ATTR_TURN_OFF_ALL = "turn_off_all"
+
+STATE_KEYS = (*SWITCH_KEYS, *APPLY_STATE_PARAM_KEYS)
+
+# 取值范围与数值实体一致
+PARAM_FIELDS = {
+    "ventilationAutoClose": vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+    "warmingAutoClose": vol.All(vol.Coerce(int), vol.Range(min=0, max=60)),
+    "overHeatAutoClose": vol.All(vol.Coerce(int), vol.Range(min=35, max=60)),
+}
+STATE_FIELDS = {
+    **{vol.Optional(key): cv.boolean for key in SWITCH_KEYS},
+    **{vol.Optional(key): validator for key, validator in PARAM_FIELDS.items()},
+    vol.Optional("lightAutoClose"): cv.time,
+}
+# snapshot 中保存的是设备上报的 lightAutoClose：定时字典，或总分钟数
+LIGHT_AUTO_CLOSE_STATE = vol.Any(
+    vol.Schema({
+        vol.Required("stopHour"): vol.All(vol.Coerce(int), vol.Range(min=0, max=23)),
+        vol.Required("stopMinute"): vol.All(vol.Coerce(int), vol.Range(min=0, max=59)),
+        vol.Optional("status", default=True): cv.boolean,
+    }),
+    vol.All(int, vol.Range(min=0, max=24 * 60 - 1)),
+)
+# 一台设备的 snapshot 状态；name/stale 等其他键丢弃，未上报的参数为 None
+SNAPSHOT_STATE = vol.Schema(
+    {
+        **{vol.Optional(key): cv.boolean for key in SWITCH_KEYS},
+        **{vol.Optional(key): vol.Any(None, validator) for key, validator in PARAM_FIELDS.items()},
+        vol.Optional("lightAutoClose"): vol.Any(None, LIGHT_AUTO_CLOSE_STATE),
+    },
+    extra=vol.REMOVE_EXTRA,
+)
+CONCURRENCY_FIELD = {
+    vol.Optional(ATTR_MAX_CONCURRENCY, default=DEFAULT_FLEET_CONCURRENCY):
+        vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_FLEET_CONCURRENCY)),
+}
+
+APPLY_STATE_SCHEMA = vol.All(
+    vol.Schema({vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]), **STATE_FIELDS}),
+    cv.has_at_least_one_key(*STATE_KEYS),
+)
+RUN_COMMAND_SCHEMA = vol.All(
+    vol.Schema({
+        # 不指定设备时作用于所有已加载的设备
+        vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_TURN_OFF_ALL): cv.boolean,
+        **STATE_FIELDS,
+        **CONCURRENCY_FIELD,
+    }),
+    cv.has_at_least_one_key(ATTR_TURN_OFF_ALL, *STATE_KEYS),
+)
+SNAPSHOT_SCHEMA = vol.Schema({vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])})
+RESTORE_SCHEMA = vol.Schema({
+    # snapshot 服务返回的 devices：设备标识 -> 状态
+    vol.Required(ATTR_SNAPSHOT): vol.Schema({cv.string: SNAPSHOT_STATE}),
+    **CONCURRENCY_FIELD,
+})
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+
+    async def async_apply_state(call: ServiceCall) -> None:
+        """Apply switch and parameter values to each target device in one pass."""
+        for coordinator in _coordinators_for_devices(hass, call.data[ATTR_DEVICE_ID]).values():
+            sent = await coordinator.async_apply_state(_requested_changes(coordinator, call.data))
+            _LOGGER.debug("apply_state on %s sent %s", coordinator.name, sent)
+
+    async def async_run_command(call: ServiceCall) -> ServiceResponse:
+        """Apply the same command to many devices, a bounded number at a time."""
+        if ATTR_DEVICE_ID in call.data:
+            coordinators = _coordinators_for_devices(hass, call.data[ATTR_DEVICE_ID])
+        else:
+            coordinators = _loaded_coordinators(hass)
+
+        def changes_for(coordinator):
+            changes = {}
+            if call.data.get(ATTR_TURN_OFF_ALL):
+                # 全关表示为逐个关闭，已关闭的设备无需请求
+                changes = dict.fromkeys(SWITCH_KEYS, False)
+            changes.update(_requested_changes(coordinator, call.data))
+            return changes
+
+        return await _async_fan_out(
+            coordinators, call.data[ATTR_MAX_CONCURRENCY],
+            lambda _device_id, coordinator: coordinator.async_apply_state(changes_for(coordinator)),
+        )
+
+    async def async_snapshot(call: ServiceCall) -> ServiceResponse:
+        """Return the current switches and parameters of every device."""
+        if ATTR_DEVICE_ID in call.data:
+            coordinators = _coordinators_for_devices(hass, call.data[ATTR_DEVICE_ID])
+        else:
+            coordinators = _loaded_coordinators(hass)
+        devices = {}
+        for device_id, coordinator in coordinators.items():
+            state = coordinator.target_state
+            if state is None:
+                continue
+            devices[device_id] = {
+                "name": coordinator.name,
+                "stale": coordinator.stale,
+                **{key: getattr(state, key) for key in STATE_KEYS},
+            }
+        return {"devices": devices}
+
+    async def async_restore(call: ServiceCall) -> ServiceResponse:
+        """Bring every device in a snapshot back to it, sending only the fields that differ."""
+        snapshot = call.data[ATTR_SNAPSHOT]
+        loaded = _loaded_coordinators(hass)
+        coordinators = {device_id: loaded.get(device_id) for device_id in snapshot}
+
+        async def restore(device_id, coordinator):
+            if coordinator is None:
+                raise ServiceValidationError(f"{device_id} is not a loaded Zinguo device")
+            changes = {key: value for key, value in snapshot[device_id].items() if value is not None}
+            return await coordinator.async_apply_state(changes)
+
+        return await _async_fan_out(coordinators, call.data[ATTR_MAX_CONCURRENCY], restore)
+
+    hass.services.async_register(DOMAIN, SERVICE_APPLY_STATE, async_apply_state, schema=APPLY_STATE_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_RUN_COMMAND, async_run_command,
+        schema=RUN_COMMAND_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNAPSHOT, async_snapshot,
+        schema=SNAPSHOT_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESTORE, async_restore,
+        schema=RESTORE_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def _async_fan_out(coordinators, max_concurrency, action) -> ServiceResponse:
+    """Run ``action(device_id, coordinator)`` for every device with at most ``max_concurrency`` in flight.
+
+    One device failing does not stop the others; each gets its own result
+    with the changes it sent or its error, and how long it took.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    start = time.monotonic()
+
+    async def run(device_id, coordinator):
+        async with semaphore:
+            device_start = time.monotonic()
+            result = {"name": coordinator.name if coordinator else None}
+            try:
+                sent = await action(device_id, coordinator)
+            except Exception as err:  # 逐台报告失败
+                _LOGGER.warning("Fleet command on %s failed: %s", result["name"] or device_id, err)
+                result.update(success=False, error=str(err))
+            else:
+                result.update(success=True, sent=sent)
+            result["elapsed_ms"] = round((time.monotonic() - device_start) * 1000, 1)
+            return device_id, result
+
+    results = await asyncio.gather(*(run(device_id, coordinator) for device_id, coordinator in coordinators.items()))
+    return {"elapsed_ms": round((time.monotonic() - start) * 1000, 1), "devices": dict(results)}
+
+
+def _requested_changes(coordinator: ZinguoDataUpdateCoordinator, data) -> dict:
+    """Return the state keys of a service call as control command changes."""
+    changes = {key: data[key] for key in STATE_KEYS if key in data}
+    if "lightAutoClose" in changes:
+        changes["lightAutoClose"] = _light_auto_close(coordinator, changes["lightAutoClose"])
+    return changes
+
+
+def _loaded_coordinators(hass: HomeAssistant) -> dict[str, ZinguoDataUpdateCoordinator]:
+    """Return every loaded coordinator by its device registry id."""
+    device_registry = dr.async_get(hass)
+    result = {}
+    for coordinator in hass.data.get(DOMAIN, {}).values():
+        # hass.data[DOMAIN] 还保存账号客户端表和令牌存储
+        if not isinstance(coordinator, ZinguoDataUpdateCoordinator):
+            continue
+        device = device_registry.async_get_device(identifiers=coordinator.device_info["identifiers"])
+        if device is not None:
+            result[device.id] = coordinator
+    return result
+
+
+def _coordinators_for_devices(hass: HomeAssistant, device_ids) -> dict[str, ZinguoDataUpdateCoordinator]:
+    """Return the coordinator behind each device registry id.
+
+    Only heater devices are accepted; the account's diagnostic device
+    belongs to the same config entry but has no coordinator of its own.
+    """
+    device_registry = dr.async_get(hass)
+    coordinators = hass.data.get(DOMAIN, {})
+    result = {}
+    for device_id in device_ids:
+        device = device_registry.async_get(device_id)
+        coordinator = next(
+            (coordinators[entry_id] for entry_id in (device.config_entries if device else ())
+             if entry_id in coordinators
+             and coordinators[entry_id].device_info["identifiers"] & device.identifiers),
+            None,
+        )
+        if coordinator is None:
+            raise ServiceValidationError(f"{device_id} is not a loaded Zinguo device")
+        result[device_id] = coordinator
+    return result
+
+
+def _light_auto_close(coordinator: ZinguoDataUpdateCoordinator, stop_time):
+    """Build the lightAutoClose value for a stop time, keeping the current status."""
+    # 与选择实体一致：保留当前的启用状态
+    current = coordinator.target_state.lightAutoClose if coordinator.target_state else None
+    status = current.get("status", True) if isinstance(current, dict) else True
+    return {"stopHour": stop_time.hour, "stopMinute": stop_time.minute, "status": status}
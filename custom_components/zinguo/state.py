@@ -0,0 +1,156 @@
+"""Immutable device state for the Zinguo integration."""
+from dataclasses import dataclass, field, fields, replace
+from enum import IntEnum
+from typing import Any
+
+from .const import PARAM_KEYS, SWITCH_KEYS
+
+
+class SwitchCode(IntEnum):
+    """Switch encoding used by the cloud API."""
+
+    ON = 1
+    OFF = 2
+
+
+SWITCH_ENCODING = {True: SwitchCode.ON, False: SwitchCode.OFF}
+SWITCH_DECODING = {SwitchCode.ON: True, SwitchCode.OFF: False}
+
+# Device model mapping based on API response from /devicetype/listAll
+DEVICE_MODELS = {
+    "M1": "门窗报警器M2/M2S",
+    "W1": "智能网关W1",
+    "K2": "墙壁开关K2",
+    "K2G": "开关群组K2G",
+    "B2": "浴霸开关B2",
+    "C2": "墙壁插座C2/C2S",
+    "T2": "智能窗帘T2",
+    "S2": "情景面板S2",
+    "H2": "控制盒H2/H2S",
+    "G6": "迎宾广告机G6",
+}
+DEFAULT_MODEL = "智能浴霸"
+
+# 云端设备记录中实际用到的字段，其余字段解码后立即丢弃
+RAW_FIELDS = (
+    "_id", "mac", "name", "model", "online", "temperature",
+    *SWITCH_KEYS, *PARAM_KEYS, "hardwareVersion", "softwareVersion",
+)
+
+
+# 云端字段 -> 由它得出的状态字段
+RAW_FIELD_STATE = {
+    "_id": ("id",),
+    "model": ("deviceModel",),
+    "softwareVersion": ("softwareVersion", "firmwareVersion"),
+}
+
+
+def project(raw_data: dict) -> dict:
+    """Keep only the fields of a cloud device record that the integration reads."""
+    return {key: raw_data[key] for key in RAW_FIELDS if key in raw_data}
+
+
+@dataclass(frozen=True, slots=True)
+class DeviceState:
+    """One snapshot of a device.
+
+    Field names mirror the cloud keys so that ``diff`` results match the
+    listener contexts and control payload keys.
+    """
+
+    id: str | None = None
+    mac: str | None = None
+    name: str | None = None
+    online: int | None = None
+    temperature: float | None = None
+    lightSwitch: bool = False
+    warmingSwitch1: bool = False
+    warmingSwitch2: bool = False
+    windSwitch: bool = False
+    ventilationSwitch: bool = False
+    ventilationAutoClose: int | None = None
+    overHeatAutoClose: int | None = None
+    warmingAutoClose: int | None = None
+    lightAutoClose: Any = None
+    comovement: int | None = None
+    motoVersion: int | None = None
+    hardwareVersion: str | None = None
+    softwareVersion: str | None = None
+    deviceModel: str = DEFAULT_MODEL
+    firmwareVersion: str = "Unknown"
+    # 预先编码的开关状态，发送控制命令时无需逐个转换
+    switch_codes: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Precompute the 1=ON/2=OFF encoding of every switch."""
+        object.__setattr__(
+            self, "switch_codes", tuple(SWITCH_ENCODING[bool(getattr(self, key))] for key in SWITCH_KEYS)
+        )
+
+    @classmethod
+    def from_raw(cls, raw_data: dict) -> "DeviceState":
+        """Build a state from a cloud device record, keeping only the fields in use."""
+        return cls(
+            id=raw_data.get("_id"),
+            mac=raw_data.get("mac"),
+            name=raw_data.get("name"),
+            online=raw_data.get("online"),
+            temperature=raw_data.get("temperature"),
+            lightSwitch=SWITCH_DECODING.get(raw_data.get("lightSwitch"), False),
+            warmingSwitch1=SWITCH_DECODING.get(raw_data.get("warmingSwitch1"), False),
+            warmingSwitch2=SWITCH_DECODING.get(raw_data.get("warmingSwitch2"), False),
+            windSwitch=SWITCH_DECODING.get(raw_data.get("windSwitch"), False),
+            ventilationSwitch=SWITCH_DECODING.get(raw_data.get("ventilationSwitch"), False),
+            ventilationAutoClose=raw_data.get("ventilationAutoClose"),
+            overHeatAutoClose=raw_data.get("overHeatAutoClose"),
+            warmingAutoClose=raw_data.get("warmingAutoClose"),
+            lightAutoClose=raw_data.get("lightAutoClose"),
+            comovement=raw_data.get("comovement"),
+            motoVersion=raw_data.get("motoVersion"),
+            hardwareVersion=raw_data.get("hardwareVersion"),
+            softwareVersion=raw_data.get("softwareVersion"),
+            deviceModel=DEVICE_MODELS.get(raw_data.get("model", ""), DEFAULT_MODEL),
+            firmwareVersion=raw_data.get("softwareVersion", "Unknown"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceState":
+        """Build a state from ``as_dict`` output, ignoring unknown keys."""
+        return cls(**{name: data[name] for name in STATE_FIELDS if name in data})
+
+    def merge_raw(self, raw_data: dict) -> "DeviceState":
+        """Return a copy updated with only the fields a (partial) cloud record carries."""
+        parsed = DeviceState.from_raw(raw_data)
+        return self.replace(**{
+            name: getattr(parsed, name)
+            for key in raw_data if key in RAW_FIELDS
+            for name in RAW_FIELD_STATE.get(key, (key,))
+        })
+
+    def replace(self, **changes) -> "DeviceState":
+        """Return a copy with some fields changed."""
+        return replace(self, **changes) if changes else self
+
+    def switch_payload(self) -> dict:
+        """Return the encoded state of every switch, as a switch write expects."""
+        return dict(zip(SWITCH_KEYS, self.switch_codes))
+
+    def as_dict(self) -> dict:
+        """Return the state as a plain dict, e.g. for diagnostics."""
+        return {name: getattr(self, name) for name in STATE_FIELDS}
+
+
+STATE_FIELDS = tuple(state_field.name for state_field in fields(DeviceState) if state_field.compare)
+
+
+def diff(old: DeviceState | None, new: DeviceState | None) -> frozenset:
+    """Return the names of the fields that differ between two states.
+
+    A missing state on either side counts as every field changed.
+    """
+    if old is new:
+        return frozenset()
+    if old is None or new is None:
+        return frozenset(STATE_FIELDS)
+    return frozenset(name for name in STATE_FIELDS if getattr(old, name) != getattr(new, name))
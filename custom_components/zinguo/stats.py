@@ -0,0 +1,180 @@
+"""In-memory API statistics for the Zinguo integration."""
+import time
+from bisect import bisect_left
+from collections import deque
+from urllib.parse import urlsplit
+
+import aiohttp
+from homeassistant.util import dt as dt_util
+
+from .const import TRACE_BUFFER_SIZE
+
+# 直方图桶上限（毫秒），最后一个桶收集更慢的请求
+LATENCY_BUCKETS_MS = (
+    5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 750,
+    1000, 1500, 2000, 3000, 5000, 7500, 10000, 15000, 30000,
+)
+
+
+class LatencyHistogram:
+    """Fixed-size latency histogram; memory does not grow with uptime."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        """Initialize."""
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+
+    def record(self, latency_ms):
+        """Add one sample."""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.total += 1
+
+    def percentile(self, quantile):
+        """Estimate a percentile in ms by interpolating inside its bucket."""
+        if not self.total:
+            return None
+        rank = quantile * self.total
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+                if index == len(LATENCY_BUCKETS_MS):
+                    return float(lower)
+                upper = LATENCY_BUCKETS_MS[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return float(LATENCY_BUCKETS_MS[-1])
+
+
+class ApiStats:
+    """Request, error and latency counters for one account."""
+
+    def __init__(self):
+        """Initialize."""
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.relogins = 0
+        self.last_success = None
+        # 对冲请求：发出的对冲次数与对冲端点先返回的次数
+        self.hedges: dict[str, int] = {}
+        self.hedge_wins: dict[str, int] = {}
+
+    def record(self, base_url, operation, latency_ms, ok):
+        """Record one request against its endpoint and operation."""
+        host = endpoint_host(base_url)
+        self.requests[host] = self.requests.get(host, 0) + 1
+        if not ok:
+            self.errors[host] = self.errors.get(host, 0) + 1
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency[operation] = LatencyHistogram()
+        histogram.record(latency_ms)
+
+    def record_hedge(self, operation):
+        """Count a hedged request."""
+        self.hedges[operation] = self.hedges.get(operation, 0) + 1
+
+    def record_hedge_win(self, operation):
+        """Count a hedged request that answered before the primary."""
+        self.hedge_wins[operation] = self.hedge_wins.get(operation, 0) + 1
+
+    def percentile(self, operation, quantile):
+        """Return a latency percentile in ms for an operation."""
+        histogram = self.latency.get(operation)
+        return histogram.percentile(quantile) if histogram else None
+
+    def as_dict(self):
+        """Return a snapshot for diagnostics."""
+        return {
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "latency_ms": {
+                operation: {
+                    "count": histogram.total,
+                    "p50": histogram.percentile(0.5),
+                    "p95": histogram.percentile(0.95),
+                }
+                for operation, histogram in self.latency.items()
+            },
+            "relogins": self.relogins,
+            "hedges": dict(self.hedges),
+            "hedge_wins": dict(self.hedge_wins),
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+        }
+
+
+def endpoint_host(base_url):
+    """Return the host part of an endpoint URL."""
+    return urlsplit(base_url).netloc or base_url
+
+
+class RequestTracer:
+    """Record per-phase timings of recent requests in a bounded ring buffer.
+
+    aiohttp reports TCP connect and TLS handshake as one connection phase.
+    """
+
+    def __init__(self, size=TRACE_BUFFER_SIZE):
+        """Initialize."""
+        self.records = deque(maxlen=size)
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        self.trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        self.trace_config.on_connection_create_start.append(self._on_connect_start)
+        self.trace_config.on_connection_create_end.append(self._on_connect_end)
+        self.trace_config.on_request_end.append(self._on_request_end)
+        self.trace_config.on_response_chunk_received.append(self._on_chunk)
+        self.trace_config.on_request_exception.append(self._on_request_exception)
+
+    @staticmethod
+    def _elapsed_ms(since):
+        return round((time.monotonic() - since) * 1000, 1)
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.start = time.monotonic()
+        ctx.record = {
+            "time": dt_util.utcnow().isoformat(),
+            "method": params.method,
+            "endpoint": f"{params.url.host}{params.url.path}",
+            "status": None,
+            "size": 0,
+            "dns_ms": None,
+            "connect_ms": None,
+            "ttfb_ms": None,
+            "transfer_ms": None,
+        }
+        # 调用方可以通过 trace_request_ctx 补充自身处理耗时
+        if isinstance(ctx.trace_request_ctx, dict):
+            ctx.trace_request_ctx["record"] = ctx.record
+        self.records.append(ctx.record)
+
+    async def _on_dns_start(self, session, ctx, params):
+        ctx.dns_start = time.monotonic()
+
+    async def _on_dns_end(self, session, ctx, params):
+        ctx.record["dns_ms"] = self._elapsed_ms(ctx.dns_start)
+
+    async def _on_connect_start(self, session, ctx, params):
+        ctx.connect_start = time.monotonic()
+
+    async def _on_connect_end(self, session, ctx, params):
+        ctx.record["connect_ms"] = self._elapsed_ms(ctx.connect_start)
+
+    async def _on_request_end(self, session, ctx, params):
+        # 收到响应头即为首字节时间
+        ctx.headers_at = time.monotonic()
+        ctx.record["status"] = params.response.status
+        ctx.record["ttfb_ms"] = self._elapsed_ms(ctx.start)
+
+    async def _on_chunk(self, session, ctx, params):
+        ctx.record["size"] += len(params.chunk)
+        if hasattr(ctx, "headers_at"):
+            ctx.record["transfer_ms"] = self._elapsed_ms(ctx.headers_at)
+
+    async def _on_request_exception(self, session, ctx, params):
+        ctx.record["error"] = type(params.exception).__name__
+        ctx.record["total_ms"] = self._elapsed_ms(ctx.start)
@@ -0,0 +1,79 @@
+"""Transports between the coordinator and the Zinguo cloud."""
+from abc import ABC, abstractmethod
+
+from homeassistant.core import callback
+
+from .api import ZinguoApiClient
+
+
+class ZinguoTransport(ABC):
+    """Read/control/subscribe contract used by the coordinator.
+
+    Account-level state (login and token, request statistics, the bulk
+    status cache) stays on the shared API client.
+    """
+
+    def __init__(self, client: ZinguoApiClient):
+        """Initialize."""
+        self.client = client
+
+    @property
+    def connected(self):
+        """Return whether pushed updates are currently being received."""
+        return False
+
+    @abstractmethod
+    async def async_read(self, mac, hedge=False):
+        """Return the raw status of one device."""
+
+    @abstractmethod
+    async def async_read_account(self, max_age):
+        """Return the account's devices by MAC, at most ``max_age`` seconds old."""
+
+    @abstractmethod
+    async def async_control(self, control_payload):
+        """Send a control payload; return (accepted, response record or None)."""
+
+    @callback
+    def async_subscribe(self, mac, event_callback):
+        """Deliver pushed records for ``mac``; return an unsubscribe callback, or None."""
+        return None
+
+
+class CloudPollingTransport(ZinguoTransport):
+    """Request/response polling against the cloud HTTP API."""
+
+    async def async_read(self, mac, hedge=False):
+        """Return the raw status of one device."""
+        return await self.client.async_get_device_status(mac, hedge=hedge)
+
+    async def async_read_account(self, max_age):
+        """Return the account's devices by MAC, at most ``max_age`` seconds old."""
+        return await self.client.async_get_account_devices(max_age)
+
+    async def async_control(self, control_payload):
+        """Send a control payload; return (accepted, response record or None)."""
+        accepted, response = await self.client.async_control(control_payload)
+        if accepted:
+            # 批量缓存已过期，下一次刷新需要重新请求
+            self.client.async_invalidate_devices()
+        return accepted, response
+
+
+class CloudPushTransport(CloudPollingTransport):
+    """Polling plus the account's server-sent event stream.
+
+    Reads and controls still go over HTTP; state changes made elsewhere
+    (wall switch, vendor app) arrive on the stream as they happen. The
+    vendor cloud has no such stream, so only the fake cloud uses this.
+    """
+
+    @property
+    def connected(self):
+        """Return whether the account's event stream is open."""
+        return self.client.events_connected
+
+    @callback
+    def async_subscribe(self, mac, event_callback):
+        """Deliver pushed records for ``mac``; return an unsubscribe callback."""
+        return self.client.async_subscribe_events(mac, event_callback)
@@ -0,0 +1,36 @@
+"""Tests for the per-account shared client registry."""
+import asyncio
+import tempfile
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.zinguo.api import async_acquire_client, async_release_client
+from custom_components.zinguo.const import SIGNAL_PRIMARY_ENTRY_CHANGED
+
+USERNAME = "13800000000"
+
+
+def test_primary_entry_hands_over_on_release():
+    async def run():
+        hass = HomeAssistant(tempfile.mkdtemp(prefix="zinguo-test-"))
+        signals = []
+        async_dispatcher_connect(hass, SIGNAL_PRIMARY_ENTRY_CHANGED.format(USERNAME), lambda: signals.append(1))
+        client = async_acquire_client(hass, "first", USERNAME, "secret")
+        for entry_id in ("second", "third"):
+            assert async_acquire_client(hass, entry_id, USERNAME, "secret") is client
+
+        # 非主条目卸载不影响账号实体
+        await async_release_client(hass, "third", USERNAME)
+        await hass.async_block_till_done()
+        assert signals == []
+
+        await async_release_client(hass, "first", USERNAME)
+        await hass.async_block_till_done()
+        assert client.primary_entry_id == "second"
+        assert signals == [1]
+
+        await async_release_client(hass, "second", USERNAME)
+        await hass.async_stop(force=True)
+
+    asyncio.run(run())
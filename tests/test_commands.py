@@ -0,0 +1,136 @@
+"""Tests for the per-device command queue against the fake cloud."""
+import asyncio
+import tempfile
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers import device_registry as dr
+
+from benchmarks.fake_cloud import OFF, ON, FakeZinguoCloud
+from custom_components.zinguo.api import ZinguoApiClient
+from custom_components.zinguo.const import SWITCH_KEYS
+from custom_components.zinguo.coordinator import ZinguoDataUpdateCoordinator, fold_command
+
+# 控制请求在服务端的处理时间，足够在其在途期间排入后续命令
+LATENCY = 0.2
+
+
+def run_with_coordinator(test, command_window=0):
+    """Run ``test(cloud, coordinator)`` for one device of a slow fake cloud."""
+
+    async def run():
+        cloud = FakeZinguoCloud(latency=LATENCY)
+        await cloud.start()
+        hass = HomeAssistant(tempfile.mkdtemp(prefix="zinguo-test-"))
+        await dr.async_load(hass)
+        client = ZinguoApiClient(cloud.username, "secret", endpoints=[cloud.base_url], rate_limits=None)
+        mac, device = next(iter(cloud.devices.items()))
+        coordinator = ZinguoDataUpdateCoordinator(
+            hass, username=cloud.username, password="secret", mac=mac, name=device["name"],
+            client=client, command_window=command_window,
+        )
+        try:
+            await coordinator.async_refresh()
+            cloud.requests.clear()
+            await test(cloud, coordinator)
+        finally:
+            await coordinator.async_shutdown()
+            await client.async_close()
+            await hass.async_stop(force=True)
+            await cloud.stop()
+
+    asyncio.run(run())
+
+
+async def _send_while_in_flight(coordinator, first, *queued):
+    """Send ``first``, then queue ``queued`` while its write is in flight."""
+    tasks = [asyncio.create_task(coordinator.send_control_command(first))]
+    await asyncio.sleep(LATENCY / 4)
+    tasks.extend(asyncio.create_task(coordinator.send_control_command(payload)) for payload in queued)
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_turn_off_all_replaces_earlier_switch_changes():
+    pending = {"lightSwitch": True, "windSwitch": True, "warmingAutoClose": 20}
+    fold_command(pending, {"turnOffAll": 1})
+    assert pending == {"turnOffAll": 1, "warmingAutoClose": 20}
+
+
+def test_switch_change_after_turn_off_all_expands_it():
+    pending = {"turnOffAll": 1}
+    fold_command(pending, {"windSwitch": True})
+    assert pending == {**dict.fromkeys(SWITCH_KEYS, False), "windSwitch": True}
+
+
+def test_later_values_win():
+    pending = {"lightSwitch": True}
+    fold_command(pending, {"lightSwitch": False, "ventilationAutoClose": 10})
+    assert pending == {"lightSwitch": False, "ventilationAutoClose": 10}
+
+
+def test_queued_writes_fold_behind_the_write_in_flight():
+    async def test(cloud, coordinator):
+        tasks = await _send_while_in_flight(
+            coordinator, {"lightSwitch": True}, {"lightSwitch": False}, {"windSwitch": True},
+        )
+        assert await asyncio.gather(*tasks) == [True, True, True]
+        # 在途写入之后的两条命令合并为一次写入，且按排队顺序应用
+        assert cloud.requests["yuBaControl"] == 2
+        device = cloud.devices[coordinator.mac]
+        assert device["lightSwitch"] == OFF
+        assert device["windSwitch"] == ON
+
+    run_with_coordinator(test)
+
+
+def test_switch_change_after_queued_turn_off_all():
+    async def test(cloud, coordinator):
+        tasks = await _send_while_in_flight(
+            coordinator, {"lightSwitch": True}, {"turnOffAll": 1}, {"ventilationSwitch": True},
+        )
+        assert await asyncio.gather(*tasks) == [True, True, True]
+        device = cloud.devices[coordinator.mac]
+        assert device["lightSwitch"] == OFF
+        assert device["ventilationSwitch"] == ON
+
+    run_with_coordinator(test)
+
+
+def test_folded_callers_share_the_exception():
+    async def test(cloud, coordinator):
+        tasks = await _send_while_in_flight(
+            coordinator, {"lightSwitch": True}, {"windSwitch": True}, {"ventilationSwitch": True},
+        )
+        # 在途请求到达服务端前 token 失效且密码错误，重新登录失败
+        cloud.expire_tokens()
+        coordinator.client.password = "wrong"
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, ConfigEntryAuthFailed) for result in results)
+        assert results[1] is results[2]
+
+    run_with_coordinator(test)
+
+
+def test_shutdown_cancels_queued_commands():
+    async def test(cloud, coordinator):
+        tasks = await _send_while_in_flight(coordinator, {"lightSwitch": True}, {"windSwitch": True})
+        await coordinator.async_shutdown()
+        for task in tasks:
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    run_with_coordinator(test)
+
+
+def test_shutdown_cancels_commands_in_the_coalescing_window():
+    async def test(cloud, coordinator):
+        task = asyncio.create_task(coordinator.send_control_command({"lightSwitch": True}))
+        await asyncio.sleep(0)
+        await coordinator.async_shutdown()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert cloud.requests["yuBaControl"] == 0
+
+    run_with_coordinator(test, command_window=0.5)
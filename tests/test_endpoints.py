@@ -0,0 +1,28 @@
+"""Tests for endpoint selection at login."""
+import asyncio
+
+from benchmarks.fake_cloud import FakeZinguoCloud
+from custom_components.zinguo.api import ZinguoApiClient
+
+
+def test_losing_login_probe_is_cancelled():
+    async def run():
+        slow, fast = FakeZinguoCloud(latency=0.3), FakeZinguoCloud()
+        await slow.start()
+        await fast.start()
+        client = ZinguoApiClient(fast.username, "secret", endpoints=[slow.base_url, fast.base_url], rate_limits=None)
+        try:
+            await client.async_login()
+            assert client.base_url == fast.base_url
+            assert client.token in fast.tokens
+            # 慢端点的登录被取消，改用不登录的探测测量 RTT
+            await asyncio.sleep(0.5)
+            assert not client._probe_tasks
+            assert slow.requests["devices"] == 1
+            assert client.ranked_endpoints == [fast.base_url, slow.base_url]
+        finally:
+            await client.async_close()
+            await slow.stop()
+            await fast.stop()
+
+    asyncio.run(run())
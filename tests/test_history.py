@@ -0,0 +1,20 @@
+"""Tests for the in-memory temperature history."""
+from custom_components.zinguo.history import TemperatureHistory
+
+
+def test_repeated_timestamp_is_ignored():
+    history = TemperatureHistory(size=4)
+    history.add(10.0, 22.0)
+    # 同一次批量读取的缓存记录再次出现
+    history.add(10.0, 22.0)
+    assert history.samples == 1
+    assert list(history.window(60, 10.0)) == [(10.0, 22.0)]
+
+
+def test_older_sample_is_ignored():
+    history = TemperatureHistory(size=4)
+    history.add(10.0, 22.0)
+    history.add(20.0, 23.0)
+    history.add(15.0, 30.0)
+    assert history.samples == 2
+    assert history.latest == 23.0
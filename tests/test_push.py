@@ -0,0 +1,60 @@
+"""Tests for the push event stream."""
+import asyncio
+
+from benchmarks.fake_cloud import FakeZinguoCloud
+from custom_components.zinguo.api import ZinguoApiClient
+from custom_components.zinguo.state import DeviceState
+
+
+def run_with_client(test, **cloud_kwargs):
+    """Run ``test(cloud, client)`` with a logged-in client of a fake cloud."""
+
+    async def run():
+        cloud = FakeZinguoCloud(**cloud_kwargs)
+        await cloud.start()
+        client = ZinguoApiClient(cloud.username, "secret", endpoints=[cloud.base_url], rate_limits=None)
+        try:
+            await client.async_login()
+            await test(cloud, client)
+        finally:
+            await client.async_close()
+            await cloud.stop()
+
+    asyncio.run(run())
+
+
+def test_stream_stops_when_endpoint_is_missing():
+    async def test(cloud, client):
+        client.async_subscribe_events(next(iter(cloud.devices)), lambda record: None)
+        await asyncio.sleep(0.2)
+        assert client._event_task.done()
+        assert cloud.requests["events"] == 1
+        assert not client.events_connected
+
+    run_with_client(test, event_stream=False)
+
+
+def test_stream_does_not_log_in_after_401():
+    async def test(cloud, client):
+        cloud.expire_tokens()
+        client.async_subscribe_events(next(iter(cloud.devices)), lambda record: None)
+        # 退避 1 秒后仍持有被拒绝的 token，不再重连也不登录
+        await asyncio.sleep(1.3)
+        assert cloud.requests["events"] == 1
+        assert cloud.requests["login"] == 1
+        assert not client.events_connected
+
+    run_with_client(test)
+
+
+def test_partial_record_keeps_other_fields():
+    state = DeviceState.from_raw({
+        "_id": "fake000000", "mac": "AA", "model": "B2", "temperature": 24.0,
+        "lightSwitch": 1, "windSwitch": 1, "softwareVersion": "2.3.1",
+    })
+    merged = state.merge_raw({"mac": "AA", "windSwitch": 2})
+    assert merged.lightSwitch is True
+    assert merged.windSwitch is False
+    assert merged.temperature == 24.0
+    assert merged.firmwareVersion == "2.3.1"
+    assert state.merge_raw({"softwareVersion": "2.4.0"}).firmwareVersion == "2.4.0"
@@ -0,0 +1,111 @@
+"""Tests for the circuit breaker and its use by the API client."""
+import asyncio
+import time
+
+import pytest
+from homeassistant.exceptions import ConfigEntryAuthFailed
+
+from custom_components.zinguo.api import ZinguoApiClient
+from custom_components.zinguo.const import RATE_LIMIT_WAIT_WINDOW
+from custom_components.zinguo.resilience import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    TokenBucket,
+)
+
+ENDPOINT = "http://127.0.0.1:9/api/v1"
+
+
+def _expire(breaker):
+    """Move an open breaker past its reset timeout."""
+    breaker._opened_at = time.monotonic() - breaker.reset_timeout
+
+
+def test_breaker_opens_at_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_successful_trial_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.reset_timeout == 30
+
+
+def test_failed_trial_reopens_with_longer_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, max_reset_timeout=50)
+    breaker.record_failure()
+    _expire(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert breaker.reset_timeout == 50
+
+
+def test_released_trial_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    _expire(breaker)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+@pytest.mark.parametrize("error", [ConfigEntryAuthFailed("bad token"), Exception("no endpoint")])
+def test_request_error_during_trial_releases_breaker(error):
+    async def run():
+        client = ZinguoApiClient("user", "secret", endpoints=[ENDPOINT], rate_limits=None)
+        client.token = "token"
+        breaker = client.breakers[ENDPOINT]
+        breaker.failures = breaker.failure_threshold
+        breaker._opened_at = 0
+        _expire(breaker)
+
+        async def fail(*args):
+            raise error
+
+        client._async_send = fail
+        try:
+            with pytest.raises(type(error)):
+                await client.async_request("GET", "/device/getDeviceByMac")
+            # 试探名额已归还，下一次请求可以再次试探
+            assert breaker.allow_request()
+        finally:
+            await client.async_close()
+
+    asyncio.run(run())
+
+
+def test_recent_wait_expires_but_lifetime_max_stays():
+    async def run():
+        bucket = TokenBucket(rate=20.0, capacity=1)
+        assert await bucket.acquire(1)
+        assert await bucket.acquire(1)
+        return bucket
+
+    bucket = asyncio.run(run())
+    assert bucket.recent_max_wait() > 0
+    assert bucket.max_wait > 0
+    # 等待记录超出窗口后，传感器回落到 0，诊断中的历史最大值保留
+    bucket._recent_waits[0] = (time.monotonic() - RATE_LIMIT_WAIT_WINDOW - 1, bucket._recent_waits[0][1])
+    assert bucket.recent_max_wait() == 0.0
+    assert bucket.as_dict()["max_wait"] > 0
@@ -0,0 +1,246 @@
+"""Tests for the integration services against the fake cloud."""
+import asyncio
+import tempfile
+
+import pytest
+import voluptuous as vol
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+
+from benchmarks.fake_cloud import OFF, ON, FakeZinguoCloud
+from custom_components.zinguo.api import ZinguoApiClient
+from custom_components.zinguo.const import (
+    DATA_CLIENTS,
+    DATA_TOKEN_STORE,
+    DOMAIN,
+    SERVICE_APPLY_STATE,
+    SERVICE_RESTORE,
+    SERVICE_RUN_COMMAND,
+    SERVICE_SNAPSHOT,
+)
+from custom_components.zinguo.coordinator import ZinguoDataUpdateCoordinator
+from custom_components.zinguo.services import async_setup_services
+
+
+class Fleet:
+    """Two heater entries of one account, loaded the way async_setup_entry does."""
+
+    def __init__(self, hass, cloud, coordinators, device_ids, account_device_id):
+        self.hass = hass
+        self.cloud = cloud
+        self.coordinators = coordinators
+        self.device_ids = device_ids
+        self.account_device_id = account_device_id
+        self.macs = list(cloud.devices)
+
+    async def async_call(self, service, data, return_response=False):
+        return await self.hass.services.async_call(
+            DOMAIN, service, data, blocking=True, return_response=return_response
+        )
+
+    def switch(self, index, key):
+        return self.cloud.devices[self.macs[index]][key]
+
+
+def run_with_fleet(test):
+    """Run ``test(fleet)`` on a fresh Home Assistant instance and fake cloud."""
+
+    async def run():
+        cloud = FakeZinguoCloud(devices=2)
+        await cloud.start()
+        hass = HomeAssistant(tempfile.mkdtemp(prefix="zinguo-test-"))
+        hass.config_entries = ConfigEntries(hass, {})
+        await dr.async_load(hass)
+        client = ZinguoApiClient(cloud.username, "secret", endpoints=[cloud.base_url], rate_limits=None)
+        # 与 async_setup_entry 一致：hass.data[DOMAIN] 同时保存客户端表和令牌存储
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        domain_data[DATA_CLIENTS] = {cloud.username: client}
+        domain_data[DATA_TOKEN_STORE] = object()
+
+        device_registry = dr.async_get(hass)
+        coordinators, device_ids = [], []
+        for mac, device in cloud.devices.items():
+            entry = ConfigEntry(
+                version=1, minor_version=1, domain=DOMAIN, title=device["name"],
+                data={"username": cloud.username, "mac": mac}, source="user",
+            )
+            hass.config_entries._entries[entry.entry_id] = entry
+            coordinator = ZinguoDataUpdateCoordinator(
+                hass, username=cloud.username, password="secret", mac=mac, name=device["name"],
+                client=client, device_id=device["_id"],
+            )
+            domain_data[entry.entry_id] = coordinator
+            # 与启动时一致：实体先按保存的标识注册设备，首次刷新随后完成
+            device_ids.append(
+                device_registry.async_get_or_create(config_entry_id=entry.entry_id, **coordinator.device_info).id
+            )
+            await coordinator.async_refresh()
+            coordinators.append(coordinator)
+
+        # 账号级诊断设备登记在第一个条目下
+        account_device = device_registry.async_get_or_create(
+            config_entry_id=next(iter(hass.config_entries._entries)),
+            identifiers={(DOMAIN, f"account_{cloud.username}")},
+            name="Zinguo account",
+        )
+        async_setup_services(hass)
+        try:
+            await test(Fleet(hass, cloud, coordinators, device_ids, account_device.id))
+        finally:
+            for coordinator in coordinators:
+                await coordinator.async_shutdown()
+            await client.async_close()
+            await hass.async_stop(force=True)
+            await cloud.stop()
+
+    asyncio.run(run())
+
+
+def test_apply_state_with_device_id():
+    async def test(fleet):
+        await fleet.async_call(SERVICE_APPLY_STATE, {ATTR_DEVICE_ID: fleet.device_ids[0], "lightSwitch": True})
+        assert fleet.switch(0, "lightSwitch") == ON
+        assert fleet.switch(1, "lightSwitch") == OFF
+
+    run_with_fleet(test)
+
+
+def test_apply_state_requires_device_id():
+    async def test(fleet):
+        with pytest.raises(vol.Invalid):
+            await fleet.async_call(SERVICE_APPLY_STATE, {"lightSwitch": True})
+
+    run_with_fleet(test)
+
+
+def test_apply_state_rejects_account_device():
+    async def test(fleet):
+        with pytest.raises(ServiceValidationError):
+            await fleet.async_call(
+                SERVICE_APPLY_STATE, {ATTR_DEVICE_ID: fleet.account_device_id, "lightSwitch": True}
+            )
+        assert fleet.switch(0, "lightSwitch") == OFF
+
+    run_with_fleet(test)
+
+
+def test_run_command_with_device_id():
+    async def test(fleet):
+        response = await fleet.async_call(
+            SERVICE_RUN_COMMAND, {ATTR_DEVICE_ID: [fleet.device_ids[1]], "windSwitch": True},
+            return_response=True,
+        )
+        assert list(response["devices"]) == [fleet.device_ids[1]]
+        assert response["devices"][fleet.device_ids[1]]["success"]
+        assert fleet.switch(0, "windSwitch") == OFF
+        assert fleet.switch(1, "windSwitch") == ON
+
+    run_with_fleet(test)
+
+
+def test_run_command_without_device_id():
+    async def test(fleet):
+        response = await fleet.async_call(SERVICE_RUN_COMMAND, {"windSwitch": True}, return_response=True)
+        assert set(response["devices"]) == set(fleet.device_ids)
+        assert all(result["success"] for result in response["devices"].values())
+        assert fleet.switch(0, "windSwitch") == ON
+        assert fleet.switch(1, "windSwitch") == ON
+
+    run_with_fleet(test)
+
+
+def test_snapshot_with_device_id():
+    async def test(fleet):
+        response = await fleet.async_call(
+            SERVICE_SNAPSHOT, {ATTR_DEVICE_ID: fleet.device_ids[0]}, return_response=True
+        )
+        assert list(response["devices"]) == [fleet.device_ids[0]]
+        assert response["devices"][fleet.device_ids[0]]["lightSwitch"] is False
+
+    run_with_fleet(test)
+
+
+def test_snapshot_without_device_id():
+    async def test(fleet):
+        response = await fleet.async_call(SERVICE_SNAPSHOT, {}, return_response=True)
+        assert set(response["devices"]) == set(fleet.device_ids)
+
+    run_with_fleet(test)
+
+
+def test_restore_brings_devices_back():
+    async def test(fleet):
+        snapshot = await fleet.async_call(SERVICE_SNAPSHOT, {}, return_response=True)
+        await fleet.async_call(SERVICE_RUN_COMMAND, {"lightSwitch": True})
+        response = await fleet.async_call(
+            SERVICE_RESTORE, {"snapshot": snapshot["devices"]}, return_response=True
+        )
+        assert all(result["sent"] == {"lightSwitch": False} for result in response["devices"].values())
+        assert fleet.switch(0, "lightSwitch") == OFF
+        assert fleet.switch(1, "lightSwitch") == OFF
+
+    run_with_fleet(test)
+
+
+def test_restore_reports_unknown_devices():
+    async def test(fleet):
+        snapshot = await fleet.async_call(
+            SERVICE_SNAPSHOT, {ATTR_DEVICE_ID: fleet.device_ids[0]}, return_response=True
+        )
+        devices = {**snapshot["devices"], "missing": {"lightSwitch": True}}
+        response = await fleet.async_call(SERVICE_RESTORE, {"snapshot": devices}, return_response=True)
+        assert response["devices"][fleet.device_ids[0]]["success"]
+        assert not response["devices"]["missing"]["success"]
+
+    run_with_fleet(test)
+
+
+def test_device_registry_updated_from_live_data():
+    async def test(fleet):
+        device = dr.async_get(fleet.hass).async_get(fleet.device_ids[0])
+        state = fleet.coordinators[0].data
+        assert (device.model, device.sw_version) == (state.deviceModel, state.firmwareVersion)
+        assert device.sw_version is not None
+
+    run_with_fleet(test)
+
+
+@pytest.mark.parametrize("state", [
+    {"lightSwitch": "maybe"},
+    {"overHeatAutoClose": 999},
+    {"ventilationAutoClose": -1},
+    {"lightAutoClose": {"stopHour": 25, "stopMinute": 0, "status": True}},
+    {"lightAutoClose": "22:30"},
+])
+def test_restore_rejects_invalid_values(state):
+    async def test(fleet):
+        with pytest.raises(vol.Invalid):
+            await fleet.async_call(SERVICE_RESTORE, {"snapshot": {fleet.device_ids[0]: state}})
+        assert fleet.cloud.requests["yuBaControl"] == 0
+
+    run_with_fleet(test)
+
+
+def test_restore_normalizes_values_and_drops_unknown_keys():
+    async def test(fleet):
+        state = {
+            "name": "浴霸 0", "stale": False, "unknown": 1,
+            "lightSwitch": "on", "overHeatAutoClose": "50", "warmingAutoClose": None,
+            "lightAutoClose": {"stopHour": 22, "stopMinute": 30},
+        }
+        response = await fleet.async_call(
+            SERVICE_RESTORE, {"snapshot": {fleet.device_ids[0]: state}}, return_response=True
+        )
+        assert response["devices"][fleet.device_ids[0]]["sent"] == {
+            "lightSwitch": True,
+            "overHeatAutoClose": 50,
+            "lightAutoClose": {"stopHour": 22, "stopMinute": 30, "status": True},
+        }
+        assert fleet.switch(0, "lightSwitch") == ON
+        assert fleet.switch(0, "overHeatAutoClose") == 50
+        assert fleet.coordinators[0].target_state.lightSwitch is True
+
+    run_with_fleet(test)
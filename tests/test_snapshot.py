@@ -0,0 +1,43 @@
+"""Tests for the saved device state snapshot."""
+import asyncio
+import os
+import tempfile
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
+
+from benchmarks.fake_cloud import FakeZinguoCloud
+from custom_components.zinguo.api import ZinguoApiClient
+from custom_components.zinguo.coordinator import ZinguoDataUpdateCoordinator
+
+
+def test_shutdown_flushes_pending_snapshot_save():
+    async def run():
+        cloud = FakeZinguoCloud()
+        await cloud.start()
+        hass = HomeAssistant(tempfile.mkdtemp(prefix="zinguo-test-"))
+        await dr.async_load(hass)
+        client = ZinguoApiClient(cloud.username, "secret", endpoints=[cloud.base_url], rate_limits=None)
+        store = Store(hass, 1, "zinguo.snapshot.test")
+        mac, device = next(iter(cloud.devices.items()))
+        coordinator = ZinguoDataUpdateCoordinator(
+            hass, username=cloud.username, password="secret", mac=mac, name=device["name"],
+            client=client, snapshot_store=store,
+        )
+        try:
+            await coordinator.async_refresh()
+            # 首次数据安排了延迟保存，文件尚未写入
+            assert not os.path.exists(store.path)
+            await coordinator.async_shutdown()
+            assert (await store.async_load())["device"]["mac"] == mac
+
+            # 删除条目后，已取消的延迟保存不会再写回
+            await store.async_remove()
+            await hass.async_stop(force=True)
+            assert not os.path.exists(store.path)
+        finally:
+            await client.async_close()
+            await cloud.stop()
+
+    asyncio.run(run())